@@ -1,6 +1,7 @@
 import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
 from django.core.management.utils import get_random_secret_key
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -9,6 +10,16 @@ SECRET_KEY = os.getenv('SECRET_KEY', get_random_secret_key())
 
 DEBUG = os.getenv('DEBUG', 'False') == 'True'
 
+# Ключ для генерации коротких ссылок на рецепты. Он должен быть одним
+# для всех процессов и не меняться между перезапусками, поэтому задается
+# явно и не зависит от SECRET_KEY. После появления рецептов его нельзя
+# менять без перегенерации кодов командой rekey_short_codes.
+SHORT_LINK_SECRET = os.getenv('SHORT_LINK_SECRET')
+if not SHORT_LINK_SECRET:
+    if not DEBUG:
+        raise ImproperlyConfigured('Задайте SHORT_LINK_SECRET в .env.')
+    SHORT_LINK_SECRET = 'insecure-debug-short-link-secret'
+
 ALLOWED_HOSTS = os.getenv('ALLOWED_HOSTS', '').split(',')
 
 
@@ -26,9 +37,11 @@ INSTALLED_APPS = [
     'django_extensions',
     'users.apps.UsersConfig',
     'recipes.apps.RecipesConfig',
+    'renditions.apps.RenditionsConfig',
 ]
 
 MIDDLEWARE = [
+    'common.middleware.ServerTimingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -38,6 +51,35 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Замер числа запросов к базе и времени ответа с заголовком Server-Timing.
+# Запросы, превысившие любой из порогов, пишутся в лог foodgram.requests.
+REQUEST_TIMING_ENABLED = os.getenv('REQUEST_TIMING_ENABLED', 'False') == 'True'
+REQUEST_TIMING_SLOW_QUERIES = int(
+    os.getenv('REQUEST_TIMING_SLOW_QUERIES', 30))
+REQUEST_TIMING_SLOW_MS = int(os.getenv('REQUEST_TIMING_SLOW_MS', 500))
+REQUEST_TIMING_LOGGED_QUERIES = int(
+    os.getenv('REQUEST_TIMING_LOGGED_QUERIES', 5))
+
+# Потоки для запросов на чтение под ASGI в каждом процессе. У каждого
+# потока свое соединение с базой.
+ASYNC_READ_THREADS = int(os.getenv('ASYNC_READ_THREADS', 16))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'foodgram.requests': {
+            'handlers': ['console'],
+            'level': 'WARNING',
+        },
+    },
+}
+
 ROOT_URLCONF = 'backend.urls'
 
 TEMPLATES = [
@@ -80,6 +122,18 @@ DATABASES = {
     }
 }
 
+# Общий для всех процессов кэш. В нем хранятся версии справочников,
+# по которым процессы сбрасывают свои кэши в памяти. Каталог
+# CACHE_LOCATION должен быть общим для всех процессов и контейнеров,
+# которые меняют данные: иначе сброс версии в одном контейнере
+# не виден в другом. В docker-compose это том cache.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('CACHE_LOCATION', '/tmp/foodgram_cache'),
+    }
+}
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -122,6 +176,20 @@ STATIC_ROOT = '/backend_static/static/'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Ограничения для изображений, которые загружаются в кодировке base64.
+BASE64_IMAGE_MAX_SIZE = int(
+    os.getenv('BASE64_IMAGE_MAX_SIZE', 10 * 1024 * 1024))
+BASE64_IMAGE_MAX_DIMENSION = int(
+    os.getenv('BASE64_IMAGE_MAX_DIMENSION', 6000))
+BASE64_IMAGE_MAX_PIXELS = int(
+    os.getenv('BASE64_IMAGE_MAX_PIXELS', 25_000_000))
+
+# Шрифт TrueType с кириллицей для списка покупок в PDF. В образе его
+# ставит пакет fonts-dejavu-core.
+SHOPPING_LIST_PDF_FONT = os.getenv(
+    'SHOPPING_LIST_PDF_FONT',
+    '/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf')
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
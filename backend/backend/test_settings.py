@@ -0,0 +1,27 @@
+import os
+import tempfile
+
+os.environ.setdefault('SHORT_LINK_SECRET', 'test-short-link-secret')
+
+from backend.settings import *  # noqa: E402,F401,F403
+
+# Тесты запускаются на SQLite, чтобы их можно было запустить без
+# PostgreSQL: python manage.py test --settings=backend.test_settings
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': ':memory:',
+    }
+}
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+PASSWORD_HASHERS = ('django.contrib.auth.hashers.MD5PasswordHasher',)
+
+MEDIA_ROOT = os.path.join(tempfile.gettempdir(), 'foodgram_test_media')
+
+REQUEST_TIMING_ENABLED = False
@@ -0,0 +1,99 @@
+import hashlib
+import threading
+import uuid
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import parse_etags
+from rest_framework.renderers import JSONRenderer
+
+
+class VersionedCache:
+    """
+    Кэш готовых ответов в памяти процесса для редко меняющихся данных.
+
+    Версия данных хранится в общем кэше Django и меняется при каждом
+    изменении данных (bump), поэтому все процессы сразу перестают
+    использовать устаревшие ответы. В памяти хранится не больше
+    max_entries последних ответов.
+    """
+
+    def __init__(self, name, max_entries=1024):
+        self.version_key = f'{name}:version'
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_version(self):
+        version = cache.get(self.version_key)
+        if version is None:
+            cache.add(self.version_key, uuid.uuid4().hex, None)
+            version = cache.get(self.version_key)
+        return version
+
+    def bump(self):
+        cache.set(self.version_key, uuid.uuid4().hex, None)
+
+    def get(self, key, factory):
+        """
+        Возвращает значение для ключа key. Если для текущей версии данных
+        значения еще нет, оно создается функцией factory.
+        """
+        version = self.get_version()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                return entry[1]
+        value = factory()
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def get_or_render(self, key, render):
+        """Возвращает пару (содержимое, ETag) для ключа key."""
+        def factory():
+            content = render()
+            return content, f'"{hashlib.sha1(content).hexdigest()}"'
+
+        return self.get(key, factory)
+
+
+class CachedReadOnlyMixin:
+    """
+    Миксин для представлений справочников: ответы list и retrieve берутся
+    из VersionedCache без обращения к базе и сериализатору, а на запрос
+    с If-None-Match и совпадающим ETag возвращается 304 Not Modified.
+    """
+    reference_cache = None
+
+    def get_cache_key(self):
+        lookup = self.kwargs.get(self.lookup_url_kwarg or self.lookup_field)
+        params = tuple(sorted(self.request.query_params.lists()))
+        return (self.action, lookup, params)
+
+    def cached_response(self, view_method, request, *args, **kwargs):
+        def render():
+            response = view_method(request, *args, **kwargs)
+            return JSONRenderer().render(response.data)
+
+        content, etag = self.reference_cache.get_or_render(
+            self.get_cache_key(), render)
+        etags = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if etag in etags or etags == ['*']:
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type='application/json')
+        response['ETag'] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs)
@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import re
+import time
+from collections import defaultdict
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+from rest_framework.serializers import BaseSerializer
+
+logger = logging.getLogger('foodgram.requests')
+
+_current_timing = ContextVar('request_timing', default=None)
+
+PLACEHOLDER_LIST = re.compile(r'\((?:\s*%s\s*,)*\s*%s\s*\)')
+VALUES_LIST = re.compile(r'\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+')
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r'\b\d+\b')
+
+
+def normalize_sql(sql):
+    """
+    Приводит запросы, отличающиеся только значениями, к одному виду,
+    чтобы одинаковые запросы из цикла (N+1) собирались в одну строку.
+    """
+    sql = VALUES_LIST.sub('(...)', PLACEHOLDER_LIST.sub('(...)', sql))
+    sql = STRING_LITERAL.sub('?', sql)
+    return NUMBER_LITERAL.sub('?', sql)
+
+
+class RequestTiming:
+    """Запросы к базе и время сериализации одного HTTP-запроса."""
+
+    def __init__(self):
+        self.queries = []
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+        self.view_start = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = time.perf_counter() - start
+            self.db_time += duration
+            self.queries.append((sql, duration))
+
+    def worst_queries(self, limit):
+        """Нормализованные запросы с наибольшим суммарным временем."""
+        grouped = defaultdict(lambda: [0, 0.0])
+        for sql, duration in self.queries:
+            group = grouped[normalize_sql(sql)]
+            group[0] += 1
+            group[1] += duration
+        return sorted(grouped.items(), key=lambda item: -item[1][1])[:limit]
+
+
+def _timed_execute(execute, sql, params, many, context):
+    # Запрос считается в замере того HTTP-запроса, в контексте которого
+    # он выполняется, в каком бы потоке это ни происходило.
+    timing = _current_timing.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    return timing(execute, sql, params, many, context)
+
+
+def instrument_connection(connection, **kwargs):
+    """Подключает замер запросов к соединению с базой один раз."""
+    if _timed_execute not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_timed_execute)
+
+
+def _timed_data(data):
+    def wrapper(serializer):
+        timing = _current_timing.get()
+        # Вложенные сериализаторы учитываются во времени внешнего.
+        if timing is None or timing.serializer_depth:
+            return data.fget(serializer)
+        timing.serializer_depth += 1
+        start = time.perf_counter()
+        try:
+            return data.fget(serializer)
+        finally:
+            timing.serializer_time += time.perf_counter() - start
+            timing.serializer_depth -= 1
+
+    wrapper.timed = True
+    return property(wrapper)
+
+
+def instrument_serializers():
+    """Подключает замер времени к свойству data сериализаторов DRF."""
+    if not getattr(BaseSerializer.data.fget, 'timed', False):
+        BaseSerializer.data = _timed_data(BaseSerializer.data)
+
+
+class ServerTimingMiddleware:
+    """
+    Считает для каждого запроса число запросов к базе, их суммарное
+    время, время сериализации и время работы представления и отдает их
+    в заголовке Server-Timing. Запросы, превысившие пороги по числу
+    запросов к базе или по времени ответа, пишутся в лог вместе
+    с самыми долгими нормализованными SQL-запросами.
+
+    Включается настройкой REQUEST_TIMING_ENABLED, выключенный
+    middleware исключается из цепочки при запуске и ничего не стоит.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_TIMING_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.slow_queries = settings.REQUEST_TIMING_SLOW_QUERIES
+        self.slow_ms = settings.REQUEST_TIMING_SLOW_MS
+        self.logged_queries = settings.REQUEST_TIMING_LOGGED_QUERIES
+        instrument_serializers()
+        # Под ASGI запросы к базе выполняются в разных потоках, поэтому
+        # замер подключается к каждому новому соединению.
+        connection_created.connect(instrument_connection)
+        if asyncio.iscoroutinefunction(get_response):
+            self._is_coroutine = asyncio.coroutines._is_coroutine
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        for connection in connections.all():
+            instrument_connection(connection)
+        timing = RequestTiming()
+        token = _current_timing.set(timing)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_timing.reset(token)
+        return self.add_timing(request, response, timing, start)
+
+    async def __acall__(self, request):
+        timing = RequestTiming()
+        token = _current_timing.set(timing)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_timing.reset(token)
+        return self.add_timing(request, response, timing, start)
+
+    def add_timing(self, request, response, timing, start):
+        total_ms = (time.perf_counter() - start) * 1000
+        view_ms = ((time.perf_counter() - timing.view_start) * 1000
+                   if timing.view_start is not None else 0.0)
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={timing.db_time * 1000:.1f};'
+            f'desc="{len(timing.queries)} queries"',
+            f'serializer;dur={timing.serializer_time * 1000:.1f}',
+            f'view;dur={view_ms:.1f}',
+            f'total;dur={total_ms:.1f}',
+        ))
+        if (len(timing.queries) >= self.slow_queries
+                or total_ms >= self.slow_ms):
+            self.log_slow_request(request, response, timing, total_ms)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timing = _current_timing.get()
+        if timing is not None:
+            timing.view_start = time.perf_counter()
+
+    def log_slow_request(self, request, response, timing, total_ms):
+        lines = [
+            f'{request.method} {request.get_full_path()} '
+            f'{response.status_code}: {total_ms:.0f} ms, '
+            f'{len(timing.queries)} queries in '
+            f'{timing.db_time * 1000:.0f} ms, serializer '
+            f'{timing.serializer_time * 1000:.0f} ms'
+        ]
+        for sql, (count, duration) in timing.worst_queries(
+                self.logged_queries):
+            lines.append(f'  {count} x {duration * 1000:.1f} ms: {sql}')
+        logger.warning('\n'.join(lines))
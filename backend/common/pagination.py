@@ -1,4 +1,10 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.pagination import (Cursor,
+                                       CursorPagination,
+                                       PageNumberPagination)
 
 
 class LimitPageNumberPagination(PageNumberPagination):
@@ -7,3 +13,145 @@ class LimitPageNumberPagination(PageNumberPagination):
     передан в параметрах запроса. limit задает количество рецептов на странице.
     """
     page_size_query_param = 'limit'
+
+
+class LimitCursorPagination(CursorPagination):
+    """
+    Класс для курсорной пагинации без подсчета общего количества объектов.
+    Страница выбирается по ключу сортировки, а не через OFFSET, поэтому
+    время ответа не растет с номером страницы. limit задает количество
+    объектов на странице.
+
+    В отличие от CursorPagination из DRF, который ставит курсор только
+    по первому полю сортировки и пропускает строки с тем же значением
+    через OFFSET, позиция здесь - значения всех полей ordering.
+    Последнее поле должно быть уникальным: тогда позиция однозначна,
+    и новые строки с тем же pub_date не сдвигают соседние страницы.
+    """
+    page_size_query_param = 'limit'
+    ordering = ('-pub_date', '-id')
+
+    def get_keyset_filter(self, position, reverse):
+        """
+        Условие (a, b) < (a0, b0) для позиции: строки после нее
+        в порядке ordering, а для обратного курсора - перед ней.
+        """
+        try:
+            values = json.loads(position)
+        except ValueError:
+            values = None
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        condition = Q()
+        equal = {}
+        for order, value in zip(self.ordering, values):
+            field = order.lstrip('-')
+            lookup = 'lt' if order.startswith('-') != reverse else 'gt'
+            condition |= Q(**equal, **{f'{field}__{lookup}': value})
+            equal[field] = value
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        # Позиции уникальны, поэтому смещение из курсора не используется.
+        self.cursor = self.decode_cursor(request) or Cursor(
+            offset=0, reverse=False, position=None)
+        reverse, position = self.cursor.reverse, self.cursor.position
+
+        if reverse:
+            queryset = queryset.order_by(*(
+                order[1:] if order.startswith('-') else f'-{order}'
+                for order in self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+        if position is not None:
+            queryset = queryset.filter(
+                self.get_keyset_filter(position, reverse))
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > len(self.page)
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, position is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_page_link(self, item, reverse):
+        if self.page:
+            position = self._get_position_from_instance(item, self.ordering)
+        else:
+            position = self.cursor.position
+        return self.encode_cursor(
+            Cursor(offset=0, reverse=reverse, position=position))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return self.get_page_link(self.page[-1] if self.page else None,
+                                  reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        return self.get_page_link(self.page[0] if self.page else None,
+                                  reverse=True)
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for order in ordering:
+            field = order.lstrip('-')
+            if isinstance(instance, dict):
+                values.append(str(instance[field]))
+            else:
+                values.append(str(getattr(instance, field)))
+        return json.dumps(values)
+
+
+class CursorPaginationMixin:
+    """
+    Миксин для представлений, в которых курсорную пагинацию можно включить
+    параметром запроса pagination=cursor. По умолчанию остается постраничная
+    пагинация с общим количеством объектов в поле count.
+    Параметры из cursor_incompatible_params задают свою сортировку,
+    которую курсор заменил бы на cursor_ordering, поэтому вместе
+    с pagination=cursor они не принимаются.
+    """
+    cursor_pagination_class = LimitCursorPagination
+    cursor_ordering = None
+    cursor_pagination_param = 'pagination'
+    cursor_incompatible_params = ()
+
+    def use_cursor_pagination(self):
+        return (self.request.query_params.get(self.cursor_pagination_param)
+                == 'cursor')
+
+    def paginate_queryset(self, queryset):
+        if self.use_cursor_pagination():
+            params = [name for name in self.cursor_incompatible_params
+                      if self.request.query_params.get(name)]
+            if params:
+                raise ValidationError({
+                    name: 'Не используется вместе с pagination=cursor.'
+                    for name in params})
+        return super().paginate_queryset(queryset)
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator'):
+            if self.use_cursor_pagination():
+                self._paginator = self.cursor_pagination_class()
+                if self.cursor_ordering:
+                    self._paginator.ordering = self.cursor_ordering
+            else:
+                return super().paginator
+        return self._paginator
@@ -1,25 +1,111 @@
 import base64
+import binascii
+from io import BytesIO
 
-from django.core.files.base import ContentFile
+from django.conf import settings
+from django.core.files.uploadedfile import (InMemoryUploadedFile,
+                                            TemporaryUploadedFile)
+from PIL import Image
 from rest_framework.serializers import ImageField, ModelSerializer
 
 from recipes.models import Recipe
+from renditions.fields import ImageRenditionsField
+
+BASE64_CHUNK_SIZE = 64 * 1024
+IMAGE_FORMATS = {
+    'GIF': 'gif',
+    'JPEG': 'jpg',
+    'PNG': 'png',
+    'WEBP': 'webp',
+}
 
 
 class ShortResipeSerializer(ModelSerializer):
     """Сериалайзер для чтения короткой информации о рецепте."""
+    image_renditions = ImageRenditionsField()
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_renditions', 'cooking_time')
 
 
 class Base64ImageField(ImageField):
-    """Класс для поля изображения, полученного в кодировке base64."""
+    """
+    Класс для поля изображения, полученного в кодировке base64.
+
+    Размер проверяется до декодирования, строка декодируется частями
+    во временный файл (небольшие изображения - в памяти), а формат
+    и размеры изображения проверяются по заголовку до того, как Pillow
+    будет целиком распаковывать картинку.
+    """
+    default_error_messages = {
+        'invalid_base64': 'Изображение должно быть в кодировке base64.',
+        'too_large': 'Размер изображения не должен превышать {max_size} байт.',
+        'invalid_format': 'Допустимые форматы изображения: {formats}.',
+        'too_big_dimensions': ('Размеры изображения не должны превышать '
+                               '{max_dimension} пикселей по каждой стороне '
+                               'и {max_pixels} пикселей в сумме.'),
+    }
+
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
+            data = self._decode(data)
+        return super().to_internal_value(data)
 
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+    def _decode(self, data):
+        start = data.find(';base64,')
+        if start == -1:
+            self.fail('invalid_base64')
+        start += len(';base64,')
+        max_size = settings.BASE64_IMAGE_MAX_SIZE
+        size = (len(data) - start) * 3 // 4
+        if size > max_size:
+            self.fail('too_large', max_size=max_size)
 
-        return super().to_internal_value(data)
+        if size > settings.FILE_UPLOAD_MAX_MEMORY_SIZE:
+            file = TemporaryUploadedFile('temp', None, size, None)
+        else:
+            file = InMemoryUploadedFile(
+                BytesIO(), None, 'temp', None, size, None)
+        try:
+            self._decode_to_file(data, start, file)
+            file.size = file.tell()
+            file.seek(0)
+            extension = self._check_header(file)
+        except Exception:
+            file.close()
+            raise
+        file.seek(0)
+        file.name = f'temp.{extension}'
+        return file
+
+    def _decode_to_file(self, data, start, file):
+        rest = ''
+        for position in range(start, len(data), BASE64_CHUNK_SIZE):
+            chunk = rest + ''.join(
+                data[position:position + BASE64_CHUNK_SIZE].split())
+            length = len(chunk) - len(chunk) % 4
+            chunk, rest = chunk[:length], chunk[length:]
+            try:
+                file.write(base64.b64decode(chunk, validate=True))
+            except binascii.Error:
+                self.fail('invalid_base64')
+        if rest:
+            self.fail('invalid_base64')
+
+    def _check_header(self, file):
+        try:
+            image = Image.open(file)
+        except Exception:
+            self.fail('invalid_image')
+        if image.format not in IMAGE_FORMATS:
+            self.fail('invalid_format',
+                      formats=', '.join(sorted(IMAGE_FORMATS.values())))
+        max_dimension = settings.BASE64_IMAGE_MAX_DIMENSION
+        max_pixels = settings.BASE64_IMAGE_MAX_PIXELS
+        width, height = image.size
+        if (max(width, height) > max_dimension
+                or width * height > max_pixels):
+            self.fail('too_big_dimensions', max_dimension=max_dimension,
+                      max_pixels=max_pixels)
+        return IMAGE_FORMATS[image.format]
@@ -0,0 +1,121 @@
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.db import close_old_connections, connections
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_read_executor():
+    """Пул потоков для запросов на чтение под ASGI, общий для процесса."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.ASYNC_READ_THREADS,
+                thread_name_prefix='async-read')
+        return _executor
+
+
+def _run_read_view(view, request, *args, **kwargs):
+    # Соединения потоков пула живут между запросами, поэтому их,
+    # как и в обработчике Django, закрывают по CONN_MAX_AGE и после ошибок.
+    close_old_connections()
+    try:
+        response = view(request, *args, **kwargs)
+        if callable(getattr(response, 'render', None)):
+            response.render()
+        return response
+    finally:
+        close_old_connections()
+
+
+class AsyncReadMixin:
+    """
+    Добавляет к представлению DRF асинхронный вариант async_view, который
+    подставляет AsyncReadHandler. Запросы на чтение в нем выполняются
+    в пуле из ASYNC_READ_THREADS потоков, а не в единственном потоке
+    синхронного кода Django под ASGI, поэтому процесс обрабатывает
+    одновременно несколько медленных запросов. Запросы на запись
+    выполняются как у синхронного представления.
+    """
+    async_read_methods = ('GET', 'HEAD', 'OPTIONS')
+
+    @classmethod
+    def as_view(cls, *args, **kwargs):
+        view = super().as_view(*args, **kwargs)
+        read_view = functools.partial(_run_read_view, view)
+
+        @functools.wraps(view)
+        async def async_view(request, *args, **kwargs):
+            if request.method in cls.async_read_methods:
+                return await sync_to_async(
+                    read_view, thread_sensitive=False,
+                    executor=get_read_executor())(request, *args, **kwargs)
+            return await sync_to_async(view)(request, *args, **kwargs)
+
+        view.async_view = async_view
+        return view
+
+
+class AsyncReadHandler(ASGIHandler):
+    """
+    ASGI-обработчик, который вызывает асинхронные варианты представлений
+    с AsyncReadMixin. Под WSGI те же представления остаются синхронными.
+    """
+
+    def resolve_request(self, request):
+        resolver_match = super().resolve_request(request)
+        async_view = getattr(resolver_match.func, 'async_view', None)
+        if async_view is not None:
+            resolver_match.func = async_view
+        return resolver_match
+
+    async def send_response(self, response, send):
+        """
+        Django 3.2 читает потоковый ответ прямо в цикле событий, где
+        запросы к базе запрещены. Здесь части ответа читаются по одной
+        в отдельном потоке, общем для всего ответа: серверный курсор
+        привязан к соединению с базой того потока, который его открыл.
+        Ответ уходит клиенту частями, не накапливаясь в памяти.
+        """
+        if not response.streaming:
+            return await super().send_response(response, send)
+        headers = [
+            (header.encode('ascii'), value.encode('latin1'))
+            for header, value in response.items()]
+        headers.extend(
+            (b'Set-Cookie', cookie.output(header='').encode('ascii').strip())
+            for cookie in response.cookies.values())
+        await send({
+            'type': 'http.response.start',
+            'status': response.status_code,
+            'headers': headers,
+        })
+        executor = ThreadPoolExecutor(max_workers=1,
+                                      thread_name_prefix='stream')
+
+        def in_stream_thread(function):
+            return sync_to_async(function, thread_sensitive=False,
+                                 executor=executor)
+
+        parts = iter(response)
+        read_part = in_stream_thread(functools.partial(next, parts, None))
+        try:
+            while True:
+                part = await read_part()
+                if part is None:
+                    break
+                for chunk, _ in self.chunk_bytes(part):
+                    await send({'type': 'http.response.body',
+                                'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body'})
+        finally:
+            await in_stream_thread(response.close)()
+            await in_stream_thread(connections.close_all)()
+            executor.shutdown(wait=False)
@@ -1,13 +1,19 @@
 from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef, Q
 
+from common.admin import EstimatedCountPaginator
+from recipes.search import search_recipes
 from recipes.models import (Ingredient,
-                            FavoriteRecipe,
                             Recipe,
                             RecipeIngredient,
                             RecipeTag,
                             Tag)
 
 
+User = get_user_model()
+
+
 @admin.register(Ingredient)
 class IngredientAdmin(admin.ModelAdmin):
     list_display = ('name', 'measurement_unit')
@@ -27,25 +33,73 @@ class RecipeIngredientInline(admin.TabularInline):
     extra = 0
     autocomplete_fields = ('ingredient',)
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('ingredient')
+
 
 class RecipeTagInline(admin.TabularInline):
     model = RecipeTag
     extra = 0
     autocomplete_fields = ('tag',)
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('tag')
+
+
+class RecipeTagFilter(admin.SimpleListFilter):
+    """
+    Фильтр по тэгу через EXISTS: в отличие от фильтра по полю tags
+    он не соединяет рецепты с таблицей связи и не дублирует строки.
+    """
+    title = 'тэг'
+    parameter_name = 'tag'
+
+    def lookups(self, request, model_admin):
+        return Tag.objects.values_list('slug', 'name')
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(Exists(RecipeTag.objects.filter(
+                recipe=OuterRef('pk'), tag__slug=self.value())))
+        return queryset
+
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
     readonly_fields = ('number_of_favorites_added', 'pub_date')
     list_display = ('name', 'author', 'number_of_favorites_added')
     list_display_links = ('name',)
-    search_fields = ('name', 'author')
-    list_filter = ('tags',)
+    list_select_related = ('author',)
+    search_fields = ('name', '=author__username', '=author__email')
+    list_filter = (RecipeTagFilter,)
+    autocomplete_fields = ('author',)
     inlines = (RecipeIngredientInline, RecipeTagInline)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     def has_add_permission(self, request):
         return False
 
-    @admin.display(description='Добавлений в избранное:')
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Ищет рецепты по полнотекстовому индексу, а также все рецепты
+        автора, если запрос совпадает с его юзернеймом или емейлом. Автор
+        находится по уникальным индексам, а рецепты - по индексу author_id,
+        без соединения с таблицей пользователей.
+        """
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        condition = Q(pk__in=search_recipes(
+            Recipe.objects.all(), search_term).values('pk'))
+        author_ids = list(User.objects.filter(
+            Q(username=search_term) | Q(email=search_term)
+        ).values_list('pk', flat=True))
+        if author_ids:
+            condition |= Q(author__in=author_ids)
+        return queryset.filter(condition), False
+
+    @admin.display(description='Добавлений в избранное:',
+                   ordering='favorites_count')
     def number_of_favorites_added(self, instance):
-        return FavoriteRecipe.objects.filter(recipe=instance).count()
+        return instance.favorites_count
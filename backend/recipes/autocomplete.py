@@ -0,0 +1,128 @@
+import threading
+from bisect import bisect_left
+
+from recipes.caches import ingredients_cache
+from recipes.constants import INGREDIENT_SEARCH_MAX_TYPOS
+
+
+def normalize(value):
+    return value.casefold().replace('ё', 'е').strip()
+
+
+class IngredientIndex:
+    """
+    Индекс для поиска ингредиентов по началу названия.
+
+    Названия хранятся в отсортированном списке, поэтому поиск по префиксу
+    выполняется бинарным поиском. Сначала возвращаются ингредиенты,
+    название которых начинается с запроса, затем те, у которых с запроса
+    начинается одно из следующих слов, и только если совпадений
+    не хватило - названия с опечатками.
+    """
+
+    def __init__(self, ingredients):
+        self.items = sorted(
+            ingredients, key=lambda item: (normalize(item['name']),
+                                           item['id']))
+        self.keys = [normalize(item['name']) for item in self.items]
+        words = []
+        for position, key in enumerate(self.keys):
+            for word in key.split()[1:]:
+                words.append((word, position))
+        words.sort()
+        self.words = words
+        self.word_keys = [word for word, _ in words]
+
+    def _prefix_range(self, keys, query):
+        start = bisect_left(keys, query)
+        end = bisect_left(keys, query + '\uffff', lo=start)
+        return range(start, end)
+
+    def _by_prefix(self, query):
+        return self._prefix_range(self.keys, query)
+
+    def _by_word_prefix(self, query):
+        return sorted({self.words[i][1]
+                       for i in self._prefix_range(self.word_keys, query)})
+
+    def _by_typo(self, query):
+        """
+        Ищет названия, начало которых отличается от запроса не больше, чем
+        на max_distance правок. Отсортированный список обходится как
+        префиксное дерево: у каждого префикса есть непрерывный диапазон
+        названий, а ветки, в которых расстояние уже превысило допустимое,
+        отбрасываются целиком.
+        """
+        max_distance = min(INGREDIENT_SEARCH_MAX_TYPOS, len(query) // 3)
+        if not max_distance:
+            return []
+        keys = self.keys
+        distances = {}
+        stack = [('', 0, len(keys), list(range(len(query) + 1)),
+                  max_distance + 1)]
+        while stack:
+            prefix, lo, hi, row, best = stack.pop()
+            if row[-1] < best:
+                best = row[-1]
+                for position in range(lo, hi):
+                    if distances.get(position, best + 1) > best:
+                        distances[position] = best
+            depth = len(prefix)
+            if min(row) > max_distance or depth >= len(query) + best - 1:
+                continue
+            while lo < hi and len(keys[lo]) == depth:
+                lo += 1
+            while lo < hi:
+                char = keys[lo][depth]
+                child = prefix + char
+                end = bisect_left(keys, child + '\uffff', lo, hi)
+                child_row = [row[0] + 1]
+                for i, query_char in enumerate(query, start=1):
+                    child_row.append(min(
+                        row[i] + 1,
+                        child_row[i - 1] + 1,
+                        row[i - 1] + (query_char != char)))
+                stack.append((child, lo, end, child_row, best))
+                lo = end
+        return sorted(distances, key=lambda position: (distances[position],
+                                                       position))
+
+    def search(self, query, limit):
+        query = normalize(query)
+        if not query:
+            return self.items[:limit]
+        positions = list(self._by_prefix(query)[:limit])
+        if len(positions) < limit:
+            seen = set(positions)
+            positions.extend(
+                position for position in self._by_word_prefix(query)
+                if position not in seen)
+        if not positions:
+            positions = self._by_typo(query)
+        return [self.items[position] for position in positions[:limit]]
+
+
+_index = None
+_index_version = None
+_lock = threading.Lock()
+
+
+def build_ingredient_index():
+    from recipes.models import Ingredient
+    return IngredientIndex(
+        Ingredient.objects.values('id', 'name', 'measurement_unit'))
+
+
+def get_ingredient_index():
+    """
+    Возвращает индекс ингредиентов текущего процесса. Индекс строится
+    при первом обращении и заново после смены версии ингредиентов
+    в ingredients_cache, в том числе из другого процесса.
+    """
+    global _index, _index_version
+    version = ingredients_cache.get_version()
+    with _lock:
+        if _index is None or _index_version != version:
+            _index = build_ingredient_index()
+            _index_version = version
+        return _index
@@ -0,0 +1,265 @@
+import http.client
+import math
+import re
+import statistics
+import threading
+import time
+from collections import defaultdict
+from urllib.parse import urlencode, urlsplit
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import Exists, OuterRef
+from django.test import Client
+from rest_framework.authtoken.models import Token
+
+from common.middleware import RequestTiming
+from recipes.constants import (BENCHMARK_AUTHENTICATED_SHARE,
+                               BENCHMARK_INGREDIENT_SAMPLE,
+                               BENCHMARK_PAGE_SIZE,
+                               BENCHMARK_RECIPE_SAMPLE)
+from recipes.models import Ingredient, Recipe, ShoppingCart, Tag
+from users.models import Subscribtion
+
+User = get_user_model()
+
+SERVER_TIMING_DB = re.compile(r'db;dur=([\d.]+);desc="(\d+) queries"')
+
+# Сценарии и их доля в нагрузке.
+SCENARIO_WEIGHTS = {
+    'recipes': 35,
+    'recipe': 15,
+    'recipes_by_tag': 10,
+    'ingredients': 20,
+    'subscriptions': 10,
+    'shopping_cart': 5,
+    'tags': 5,
+}
+# Сценарии, которые без авторизации не имеют смысла.
+AUTHENTICATED_SCENARIOS = ('subscriptions', 'shopping_cart')
+
+
+def get_benchmark_users(count):
+    """
+    Возвращает пользователей, от имени которых идут запросы: сначала
+    тех, у кого есть список покупок и подписки.
+    """
+    users = (User.objects.filter(is_active=True)
+             .alias(
+                 has_cart=Exists(ShoppingCart.objects.filter(
+                     user=OuterRef('pk'))),
+                 has_subscriptions=Exists(Subscribtion.objects.filter(
+                     user=OuterRef('pk'))))
+             .order_by('-has_cart', '-has_subscriptions', 'pk'))
+    return list(users[:count])
+
+
+class Workload:
+    """
+    Готовит запросы сценариев по данным из базы. Все случайные
+    значения берутся из переданного генератора, поэтому план запросов
+    с одним seed на одних данных повторяется.
+    """
+
+    def __init__(self, users):
+        self.tokens = [Token.objects.get_or_create(user=user)[0].key
+                       for user in users]
+        recipe_ids = list(Recipe.objects.order_by('pk')
+                          .values_list('pk', flat=True))
+        step = max(len(recipe_ids) // BENCHMARK_RECIPE_SAMPLE, 1)
+        self.recipe_ids = recipe_ids[::step]
+        self.recipe_pages = max(-(-len(recipe_ids) // BENCHMARK_PAGE_SIZE), 1)
+        self.tag_slugs = list(Tag.objects.values_list('slug', flat=True))
+        names = Ingredient.objects.order_by('pk').values_list(
+            'name', flat=True)
+        step = max(names.count() // BENCHMARK_INGREDIENT_SAMPLE, 1)
+        self.ingredient_prefixes = sorted({
+            name[:length] for name in names[::step] for length in (1, 2, 3)})
+
+    def recipes(self, rng):
+        # Первые страницы открывают намного чаще последних.
+        page = min(int(rng.paretovariate(1.5)), self.recipe_pages)
+        return '/api/recipes/', {'page': page, 'limit': BENCHMARK_PAGE_SIZE}
+
+    def recipe(self, rng):
+        return f'/api/recipes/{rng.choice(self.recipe_ids)}/', {}
+
+    def recipes_by_tag(self, rng):
+        return '/api/recipes/', {'tags': rng.choice(self.tag_slugs),
+                                 'limit': BENCHMARK_PAGE_SIZE}
+
+    def ingredients(self, rng):
+        return '/api/ingredients/', {
+            'name': rng.choice(self.ingredient_prefixes)}
+
+    def subscriptions(self, rng):
+        return '/api/users/subscriptions/', {
+            'limit': BENCHMARK_PAGE_SIZE, 'recipes_limit': 3}
+
+    def shopping_cart(self, rng):
+        return '/api/recipes/download_shopping_cart/', {}
+
+    def tags(self, rng):
+        return '/api/tags/', {}
+
+    def get_plan(self, rng, count, weights):
+        """Возвращает список запросов [(сценарий, путь, токен или None)]."""
+        names = [name for name, weight in weights.items() if weight > 0]
+        plan = []
+        for name in rng.choices(names, [weights[name] for name in names],
+                                k=count):
+            path, params = getattr(self, name)(rng)
+            if params:
+                path = f'{path}?{urlencode(params)}'
+            token = (rng.choice(self.tokens)
+                     if name in AUTHENTICATED_SCENARIOS
+                     or rng.random() < BENCHMARK_AUTHENTICATED_SHARE
+                     else None)
+            plan.append((name, path, token))
+        return plan
+
+
+class InProcessClient:
+    """
+    Выполняет запросы через обработчик Django в этом же процессе
+    и считает запросы к базе в соединении потока.
+    """
+
+    def __init__(self):
+        self.client = Client()
+
+    def get(self, path, token):
+        headers = {'HTTP_AUTHORIZATION': f'Token {token}'} if token else {}
+        timing = RequestTiming()
+        with connection.execute_wrapper(timing):
+            response = self.client.get(path, **headers)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return response.status_code, len(timing.queries), timing.db_time * 1000
+
+    def close(self):
+        connection.close()
+
+
+class HttpClient:
+    """
+    Выполняет запросы к запущенному серверу. Число запросов к базе
+    берется из заголовка Server-Timing, если он включен на сервере.
+    """
+
+    def __init__(self, base_url):
+        url = urlsplit(base_url)
+        connection_class = (http.client.HTTPSConnection
+                            if url.scheme == 'https'
+                            else http.client.HTTPConnection)
+        self.connection = connection_class(url.netloc, timeout=60)
+        self.prefix = url.path.rstrip('/')
+
+    def get(self, path, token):
+        headers = {'Authorization': f'Token {token}'} if token else {}
+        for attempt in range(2):
+            try:
+                self.connection.request('GET', self.prefix + path,
+                                        headers=headers)
+                response = self.connection.getresponse()
+                response.read()
+                break
+            except (http.client.HTTPException, OSError):
+                # Сервер мог закрыть соединение, открытое для прошлого
+                # запроса.
+                self.connection.close()
+                if attempt:
+                    raise
+        match = SERVER_TIMING_DB.search(
+            response.getheader('Server-Timing') or '')
+        if match is None:
+            return response.status, None, None
+        return response.status, int(match[2]), float(match[1])
+
+    def close(self):
+        self.connection.close()
+
+
+def run_plan(make_client, plan, concurrency):
+    """
+    Выполняет план в concurrency потоках, у каждого потока свой клиент.
+    Возвращает результаты [(сценарий, статус, мс, запросы, мс в базе)]
+    и общее время в секундах. Статус 0 - ответ не получен.
+    """
+    results = []
+    position = iter(range(len(plan)))
+    lock = threading.Lock()
+
+    def worker():
+        client = make_client()
+        try:
+            while True:
+                with lock:
+                    index = next(position, None)
+                if index is None:
+                    return
+                name, path, token = plan[index]
+                start = time.perf_counter()
+                try:
+                    status, queries, db_time = client.get(path, token)
+                except (OSError, http.client.HTTPException):
+                    # Оборванное соединение считается ошибкой запроса.
+                    status, queries, db_time = 0, None, None
+                latency = (time.perf_counter() - start) * 1000
+                with lock:
+                    results.append((name, status, latency, queries, db_time))
+        finally:
+            client.close()
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - start
+
+
+def percentile(values, percent):
+    """Процентиль по ближайшему рангу для отсортированного списка."""
+    return values[max(math.ceil(len(values) * percent / 100) - 1, 0)]
+
+
+def summarize_results(results, elapsed):
+    """Считает задержки и запросы к базе по сценариям и в целом."""
+    groups = defaultdict(list)
+    for result in results:
+        groups[result[0]].append(result)
+        groups['total'].append(result)
+    summary = {}
+    for name, group in sorted(groups.items()):
+        latencies = sorted(latency for _, _, latency, _, _ in group)
+        queries = [count for *_, count, _ in group if count is not None]
+        db_times = [db_time for *_, db_time in group if db_time is not None]
+        summary[name] = {
+            'requests': len(group),
+            'errors': sum(not 200 <= status < 400
+                          for _, status, *_ in group),
+            'rps': len(group) / elapsed,
+            'mean_ms': statistics.mean(latencies),
+            'p50_ms': percentile(latencies, 50),
+            'p95_ms': percentile(latencies, 95),
+            'p99_ms': percentile(latencies, 99),
+            'max_ms': latencies[-1],
+            'queries': statistics.mean(queries) if queries else None,
+            'db_ms': statistics.mean(db_times) if db_times else None,
+        }
+    return summary
+
+
+def compare_summaries(previous, current, metric):
+    """Возвращает [(сценарий, было, стало, изменение в %)] по метрике."""
+    rows = []
+    for name in sorted(previous.keys() & current.keys()):
+        before = previous[name].get(metric)
+        after = current[name].get(metric)
+        if before is None or after is None:
+            continue
+        change = (after - before) / before * 100 if before else 0.0
+        rows.append((name, before, after, change))
+    return rows
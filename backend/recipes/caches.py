@@ -0,0 +1,5 @@
+from common.cache import VersionedCache
+
+ingredients_cache = VersionedCache('ingredients')
+tags_cache = VersionedCache('tags')
+recipes_cache = VersionedCache('recipes')
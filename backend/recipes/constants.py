@@ -4,4 +4,33 @@ INGREDIENT_NAME_MAX_LENGHT = 128
 INGREDIENT_MEASUREMENT_UNIT_MAX_LENGHT = 64
 RECIPE_NAME_MAX_LENGHT = 256
 TEXT_MAX_LENGHT_FOR_ADMIN_ZONE = 20
-CODE_FOR_RECIPE_SHORT_LINK_MAX_LENGTH = 3
+CODE_FOR_RECIPE_SHORT_LINK_MAX_LENGTH = 8
+SHORT_CODE_MIN_LENGTH = 4
+SHORT_CODE_FEISTEL_ROUNDS = 4
+INGREDIENT_SEARCH_LIMIT = 50
+INGREDIENT_SEARCH_MAX_LIMIT = 200
+INGREDIENT_SEARCH_MAX_TYPOS = 2
+SHOPPING_LIST_CHUNK_SIZE = 500
+# Размеры в пунктах, страница A4.
+SHOPPING_LIST_PDF_PAGE_SIZE = (595, 842)
+SHOPPING_LIST_PDF_MARGIN = 50
+SHOPPING_LIST_PDF_FONT_SIZE = 12
+SHOPPING_LIST_PDF_TITLE_SIZE = 16
+SHOPPING_LIST_PDF_LINE_SPACING = 1.5
+IMPORT_BATCH_SIZE = 5000
+IMPORT_MAX_REPORTED_ERRORS = 20
+JSON_READ_CHUNK_SIZE = 64 * 1024
+JSON_MAX_ITEM_SIZE = 1024 * 1024
+RECIPE_BATCH_MAX_SIZE = 100
+SEARCH_CONFIG = 'russian'
+SEED_BATCH_SIZE = 2000
+SEED_ZIPF_EXPONENT = 1.1
+SEED_IMAGE_SIZE = (640, 480)
+SEED_PERIOD_DAYS = 365
+SEED_RECIPE_INGREDIENTS = (3, 12)
+SEED_RECIPE_TAGS = (1, 3)
+SEED_MAX_SAMPLE_ATTEMPTS = 20
+BENCHMARK_PAGE_SIZE = 6
+BENCHMARK_RECIPE_SAMPLE = 1000
+BENCHMARK_INGREDIENT_SAMPLE = 200
+BENCHMARK_AUTHENTICATED_SHARE = 0.5
@@ -0,0 +1,78 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import FavoriteRecipe, Recipe, ShoppingCart
+from users.models import Subscribtion
+
+
+User = get_user_model()
+
+# Счетчик в модели, модель связи и поле связи, по которому он считается.
+COUNTERS = (
+    (Recipe, 'favorites_count', FavoriteRecipe, 'recipe'),
+    (Recipe, 'in_carts_count', ShoppingCart, 'recipe'),
+    (User, 'recipes_count', Recipe, 'author'),
+    (User, 'subscribers_count', Subscribtion, 'is_subscribed_to'),
+)
+
+RECIPE_COUNTERS = {
+    FavoriteRecipe: 'favorites_count',
+    ShoppingCart: 'in_carts_count',
+}
+
+
+def change_counter(queryset, field, delta):
+    """
+    Меняет счетчик field у объектов queryset на delta одним UPDATE
+    с F-выражением. Счетчик, который из-за расхождения уже меньше
+    уменьшения, не трогается, а чинится командой reconcile_counters.
+    """
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def change_recipe_counter(model, recipe_ids, delta):
+    change_counter(Recipe.objects.filter(pk__in=recipe_ids),
+                   RECIPE_COUNTERS[model], delta)
+
+
+def get_live_count(related_model, related_field):
+    return Coalesce(Subquery(
+        related_model.objects
+        .filter(**{related_field: OuterRef('pk')})
+        .order_by()
+        .values(related_field)
+        .annotate(count=Count('pk'))
+        .values('count')
+    ), 0)
+
+
+def get_drifted(model, field, related_model, related_field):
+    """Объекты, у которых счетчик не совпадает с числом строк связи."""
+    return (model.objects
+            .annotate(live_count=get_live_count(related_model, related_field))
+            .exclude(**{field: F('live_count')}))
+
+
+def find_counter_drift():
+    """Возвращает [(модель, счетчик, число объектов с неверным значением)]."""
+    return [(model, field, get_drifted(model, field, *relation).count())
+            for model, field, *relation in COUNTERS]
+
+
+def reconcile_counters(batch_size):
+    """
+    Пересчитывает счетчики только у объектов с расхождением, пачками
+    по batch_size, чтобы не блокировать всю таблицу одним UPDATE.
+    """
+    fixed = []
+    for model, field, *relation in COUNTERS:
+        pks = list(get_drifted(model, field, *relation)
+                   .values_list('pk', flat=True))
+        for start in range(0, len(pks), batch_size):
+            model.objects.filter(pk__in=pks[start:start + batch_size]).update(
+                **{field: get_live_count(*relation)})
+        fixed.append((model, field, len(pks)))
+    return fixed
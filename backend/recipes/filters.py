@@ -1,41 +1,77 @@
+from django.db.models import Exists, OuterRef
 from django_filters import rest_framework as filters
-from rest_framework.filters import SearchFilter
 
-from recipes.models import Recipe, Tag
+from recipes.models import (FavoriteRecipe,
+                            Recipe,
+                            RecipeTag,
+                            ShoppingCart,
+                            Tag)
+from recipes.search import search_recipes
 
 
 class RecipeFilter(filters.FilterSet):
     """
     Класс настроек фильтрации рецептов по автору, тэгам, наличию рецепта
-    в избранном или списке покупок.
+    в избранном или списке покупок и полнотекстового поиска.
+
+    Фильтры по связанным таблицам записаны как EXISTS, а не как JOIN,
+    поэтому рецепт с несколькими подходящими тэгами не дублируется
+    в выдаче и DISTINCT не нужен.
     """
-    tags = filters.ModelMultipleChoiceFilter(field_name='tags__slug',
-                                             to_field_name='slug',
+    TAGS_MATCH_ANY = 'any'
+    TAGS_MATCH_ALL = 'all'
+
+    tags = filters.ModelMultipleChoiceFilter(to_field_name='slug',
                                              queryset=Tag.objects.all(),
-                                             conjoined=False)
+                                             method='filter_tags')
+    tags_match = filters.ChoiceFilter(
+        choices=((TAGS_MATCH_ANY, 'Любой из тэгов'),
+                 (TAGS_MATCH_ALL, 'Все тэги')),
+        method='filter_tags_match')
     is_favorited = filters.BooleanFilter(
         field_name='favorite_recipes', method='filter_by_boolean_field')
     is_in_shopping_cart = filters.BooleanFilter(
         field_name='shopping_cart', method='filter_by_boolean_field')
+    search = filters.CharFilter(method='filter_search')
+
+    user_recipe_models = {
+        'favorite_recipes': FavoriteRecipe,
+        'shopping_cart': ShoppingCart,
+    }
+
+    def filter_tags(self, queryset, name, value):
+        # Тэги уже найдены по слагам одним запросом при проверке формы,
+        # в подзапросы передаются только их id.
+        tag_ids = [tag.id for tag in value]
+        if not tag_ids:
+            return queryset
+        if self.form.cleaned_data.get('tags_match') == self.TAGS_MATCH_ALL:
+            return queryset.filter(*(
+                Exists(RecipeTag.objects.filter(recipe=OuterRef('pk'),
+                                                tag=tag_id))
+                for tag_id in tag_ids))
+        return queryset.filter(Exists(RecipeTag.objects.filter(
+            recipe=OuterRef('pk'), tag__in=tag_ids)))
+
+    def filter_tags_match(self, queryset, name, value):
+        # Режим учитывается в filter_tags.
+        return queryset
 
     def filter_by_boolean_field(self, queryset, name, value):
         user = self.request.user
         if not user.is_authenticated:
             return queryset
-        if value:
-            filter_kwargs = {f'{name}__user': user}
-            return queryset.filter(**filter_kwargs)
-        else:
-            filter_kwargs = {f'{name}__user': user}
-            return queryset.exclude(**filter_kwargs)
+        in_list = Exists(self.user_recipe_models[name].objects.filter(
+            user=user, recipe=OuterRef('pk')))
+        return queryset.filter(in_list if value else ~in_list)
+
+    def filter_search(self, queryset, name, value):
+        value = value.strip()
+        if not value:
+            return queryset
+        return search_recipes(queryset, value)
 
     class Meta:
         model = Recipe
-        fields = ('author', 'tags', 'is_favorited', 'is_in_shopping_cart')
-
-
-class IngredientSearchFilter(SearchFilter):
-    """
-    Класс для поиска ингредиентов по параметру name, переданному в запросе.
-    """
-    search_param = 'name'
+        fields = ('author', 'tags', 'tags_match', 'is_favorited',
+                  'is_in_shopping_cart', 'search')
@@ -0,0 +1,160 @@
+import csv
+import io
+import json
+import re
+
+from django.db import connection
+
+from recipes.constants import (INGREDIENT_MEASUREMENT_UNIT_MAX_LENGHT,
+                               INGREDIENT_NAME_MAX_LENGHT,
+                               JSON_MAX_ITEM_SIZE,
+                               JSON_READ_CHUNK_SIZE)
+from recipes.models import Ingredient
+
+WHITESPACE = re.compile(r'\s*')
+
+
+class InvalidRow(ValueError):
+    pass
+
+
+def read_csv(stream):
+    for number, row in enumerate(csv.reader(stream), start=1):
+        if len(row) != 2:
+            yield number, InvalidRow(f'ожидается 2 колонки: {row}')
+        else:
+            yield number, row
+
+
+def read_ndjson(stream):
+    for number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except ValueError as error:
+            yield number, InvalidRow(f'некорректный JSON: {error}')
+
+
+def read_json(stream):
+    """
+    Читает JSON-массив по частям: в памяти хранится только
+    непрочитанный остаток буфера, а не весь файл.
+    """
+    decoder = json.JSONDecoder()
+    buffer, position = stream.read(JSON_READ_CHUNK_SIZE), 0
+    position = WHITESPACE.match(buffer, position).end()
+    if buffer[position:position + 1] != '[':
+        raise ValueError('JSON-файл должен содержать массив.')
+    position += 1
+    number = 0
+    expect_comma = False
+    while True:
+        position = WHITESPACE.match(buffer, position).end()
+        if position == len(buffer):
+            chunk = stream.read(JSON_READ_CHUNK_SIZE)
+            if not chunk:
+                raise ValueError('JSON-массив не закончен.')
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        if buffer[position] == ']':
+            return
+        if expect_comma:
+            if buffer[position] != ',':
+                raise ValueError(f'Ожидается запятая после элемента {number}.')
+            position += 1
+            expect_comma = False
+            continue
+        try:
+            item, end = decoder.raw_decode(buffer, position)
+        except ValueError:
+            chunk = stream.read(JSON_READ_CHUNK_SIZE)
+            if not chunk:
+                raise
+            if len(buffer) - position > JSON_MAX_ITEM_SIZE:
+                raise ValueError(
+                    f'Элемент {number + 1} не удалось разобрать.')
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        number += 1
+        expect_comma = True
+        position = end
+        yield number, item
+
+
+READERS = {
+    'csv': read_csv,
+    'json': read_json,
+    'ndjson': read_ndjson,
+}
+
+
+def clean_row(row):
+    """Возвращает пару (название, единица измерения) или InvalidRow."""
+    if isinstance(row, dict):
+        row = (row.get('name'), row.get('measurement_unit'))
+    elif not isinstance(row, (list, tuple)) or len(row) != 2:
+        return InvalidRow(f'неизвестный формат строки: {row!r}')
+    name, measurement_unit = row
+    if not isinstance(name, str) or not isinstance(measurement_unit, str):
+        return InvalidRow(f'название и единица должны быть строками: {row}')
+    name, measurement_unit = name.strip().lower(), measurement_unit.strip()
+    if not name or not measurement_unit:
+        return InvalidRow(f'пустое значение: {row}')
+    if (len(name) > INGREDIENT_NAME_MAX_LENGHT
+            or len(measurement_unit) > INGREDIENT_MEASUREMENT_UNIT_MAX_LENGHT):
+        return InvalidRow(f'слишком длинное значение: {row}')
+    if '\x00' in name or '\x00' in measurement_unit:
+        return InvalidRow(f'недопустимый символ: {row!r}')
+    return name, measurement_unit
+
+
+class IngredientWriter:
+    """
+    Записывает пачку ингредиентов, пропуская уже существующие.
+    Все строки проверены clean_row, поэтому ошибка одной строки
+    не прерывает транзакцию пачки.
+    """
+
+    def write(self, rows):
+        Ingredient.objects.bulk_create(
+            [Ingredient(name=name, measurement_unit=measurement_unit)
+             for name, measurement_unit in rows],
+            ignore_conflicts=True)
+
+
+class PostgresIngredientWriter(IngredientWriter):
+    """
+    Загружает пачку через COPY во временную таблицу и переносит строки
+    в таблицу ингредиентов одним INSERT ... ON CONFLICT DO NOTHING.
+    """
+    staging_table = 'ingredient_import'
+
+    def __init__(self):
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'CREATE TEMPORARY TABLE IF NOT EXISTS {self.staging_table} '
+                '(name text, measurement_unit text) ON COMMIT DELETE ROWS')
+        self.insert_sql = (
+            f'INSERT INTO {quote(Ingredient._meta.db_table)} '
+            '(name, measurement_unit) '
+            'SELECT DISTINCT name, measurement_unit '
+            f'FROM {self.staging_table} '
+            'ON CONFLICT (name, measurement_unit) DO NOTHING')
+
+    def write(self, rows):
+        data = io.StringIO()
+        csv.writer(data).writerows(rows)
+        data.seek(0)
+        with connection.cursor() as cursor:
+            cursor.copy_expert(
+                f'COPY {self.staging_table} (name, measurement_unit) '
+                'FROM STDIN WITH (FORMAT csv)', data)
+            cursor.execute(self.insert_sql)
+
+
+def get_ingredient_writer():
+    if connection.vendor == 'postgresql':
+        return PostgresIngredientWriter()
+    return IngredientWriter()
@@ -0,0 +1,172 @@
+import json
+import random
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+
+from recipes.benchmark import (SCENARIO_WEIGHTS,
+                               HttpClient,
+                               InProcessClient,
+                               Workload,
+                               compare_summaries,
+                               get_benchmark_users,
+                               run_plan,
+                               summarize_results)
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import AppUser
+
+
+class Command(BaseCommand):
+    help = ('Replay a weighted mix of read requests against the API and '
+            'report latency percentiles and database queries per request. '
+            'Runs in-process by default or against a server with --url. '
+            'The same seed on the same data replays the same requests.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            help='Base URL of a running server, e.g. http://localhost:8000; '
+                 'enable REQUEST_TIMING_ENABLED there to count queries')
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--warmup', type=int, default=50,
+                            help='Requests replayed before measuring')
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument('--users', type=int, default=20,
+                            help='Users that authenticated requests use')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--scenario', action='append', default=[],
+            metavar='NAME=WEIGHT',
+            help='Override a scenario weight, 0 disables it. Scenarios: '
+                 + ', '.join(SCENARIO_WEIGHTS))
+        parser.add_argument('--output', help='Save results to a JSON file')
+        parser.add_argument(
+            '--compare', help='JSON file of a previous run to compare with')
+        parser.add_argument(
+            '--max-regression', type=float,
+            help='Fail if p95 or queries of any scenario grew by more '
+                 'percent than this')
+
+    def _get_weights(self, overrides):
+        weights = dict(SCENARIO_WEIGHTS)
+        for override in overrides:
+            name, _, weight = override.partition('=')
+            if name not in weights:
+                raise CommandError(f'Unknown scenario {name}')
+            try:
+                weights[name] = float(weight)
+            except ValueError:
+                raise CommandError(f'Invalid weight in {override}')
+            if weights[name] < 0:
+                raise CommandError(f'Invalid weight in {override}')
+        if not any(weights.values()):
+            raise CommandError('All scenarios are disabled')
+        return weights
+
+    def _print_summary(self, summary):
+        self.stdout.write(
+            f'{"scenario":>16} {"requests":>8} {"errors":>6} {"rps":>8} '
+            f'{"mean":>8} {"p50":>8} {"p95":>8} {"p99":>8} '
+            f'{"queries":>7} {"db ms":>7}')
+        for name, row in summary.items():
+            queries = ('-' if row['queries'] is None
+                       else f'{row["queries"]:.1f}')
+            db_time = '-' if row['db_ms'] is None else f'{row["db_ms"]:.1f}'
+            self.stdout.write(
+                f'{name:>16} {row["requests"]:>8} {row["errors"]:>6} '
+                f'{row["rps"]:>8.1f} {row["mean_ms"]:>8.1f} '
+                f'{row["p50_ms"]:>8.1f} {row["p95_ms"]:>8.1f} '
+                f'{row["p99_ms"]:>8.1f} {queries:>7} {db_time:>7}')
+
+    def _compare(self, path, report, max_regression):
+        try:
+            with open(path, encoding='utf-8') as file:
+                previous = json.load(file)
+            scenarios = previous['scenarios']
+        except (OSError, ValueError, KeyError) as error:
+            raise CommandError(f'Cannot read {path}: {error}')
+        self.stdout.write(f'Compared with {path}:')
+        for key in ('mode', 'seed', 'requests', 'weights', 'dataset'):
+            if previous.get(key) != report[key]:
+                self.stdout.write(self.style.WARNING(
+                    f'{key} differs from the previous run, the plans '
+                    'are not the same'))
+        regressions = []
+        for metric in ('p95_ms', 'queries'):
+            for name, before, after, change in compare_summaries(
+                    scenarios, report['scenarios'], metric):
+                self.stdout.write(
+                    f'{name:>16} {metric:>8}: {before:>8.1f} -> '
+                    f'{after:>8.1f} ({change:+.1f}%)')
+                if max_regression is not None and change > max_regression:
+                    regressions.append(f'{name} {metric}')
+        return regressions
+
+    def handle(self, *args, **options):
+        for name in ('requests', 'concurrency', 'users'):
+            if options[name] < 1:
+                raise CommandError(f'--{name} must be positive')
+        if options['warmup'] < 0:
+            raise CommandError('--warmup cannot be negative')
+        weights = self._get_weights(options['scenario'])
+
+        users = get_benchmark_users(options['users'])
+        if not users or not Recipe.objects.exists():
+            raise CommandError(
+                'No users or recipes to benchmark, run seed_load first')
+        workload = Workload(users)
+        rng = random.Random(options['seed'])
+        warmup = workload.get_plan(rng, options['warmup'], weights)
+        plan = workload.get_plan(rng, options['requests'], weights)
+        # Соединение основного потока не нужно рабочим потокам.
+        connection.close()
+
+        if options['url']:
+            mode = 'http'
+
+            def make_client():
+                return HttpClient(options['url'])
+        else:
+            mode = 'in-process'
+            make_client = InProcessClient
+        with override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            if warmup:
+                run_plan(make_client, warmup, options['concurrency'])
+            results, elapsed = run_plan(
+                make_client, plan, options['concurrency'])
+        summary = summarize_results(results, elapsed)
+        self._print_summary(summary)
+
+        report = {
+            'created': datetime.now(timezone.utc).isoformat(),
+            'mode': mode,
+            'url': options['url'],
+            'vendor': connection.vendor,
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'seed': options['seed'],
+            'weights': weights,
+            'dataset': {
+                'users': AppUser.objects.count(),
+                'recipes': Recipe.objects.count(),
+                'ingredients': Ingredient.objects.count(),
+                'tags': Tag.objects.count(),
+            },
+            'elapsed': elapsed,
+            'scenarios': summary,
+        }
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, indent=2)
+            self.stdout.write(f'Results saved to {options["output"]}')
+
+        if options['compare']:
+            regressions = self._compare(
+                options['compare'], report, options['max_regression'])
+            if regressions:
+                raise CommandError(
+                    'Regression in ' + ', '.join(regressions))
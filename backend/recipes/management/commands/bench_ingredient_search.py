@@ -0,0 +1,63 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+
+from recipes.autocomplete import build_ingredient_index
+from recipes.constants import INGREDIENT_SEARCH_LIMIT
+from recipes.models import Ingredient
+
+
+class Command(BaseCommand):
+    help = ('Compare ingredient autocomplete lookups in the in-process index '
+            'with the ORM istartswith query')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('queries', nargs='*')
+
+    def _measure(self, lookup, queries, repeat):
+        timings = []
+        for _ in range(repeat):
+            for query in queries:
+                start = time.perf_counter()
+                lookup(query)
+                timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        return (statistics.mean(timings),
+                timings[int(len(timings) * 0.95) - 1])
+
+    def handle(self, *args, **options):
+        queries = options['queries']
+        if not queries:
+            names = Ingredient.objects.values_list('name', flat=True)[::50]
+            queries = [name[:length] for name in names for length in (1, 3)]
+        if not queries:
+            self.stderr.write(self.style.ERROR('No ingredients to search'))
+            return
+
+        start = time.perf_counter()
+        index = build_ingredient_index()
+        build_time = (time.perf_counter() - start) * 1000
+        self.stdout.write(
+            f'Index built in {build_time:.1f} ms '
+            f'for {len(index.items)} ingredients')
+
+        def orm_lookup(query):
+            return list(
+                Ingredient.objects.filter(name__istartswith=query)
+                .values('id', 'name', 'measurement_unit')
+                [:INGREDIENT_SEARCH_LIMIT])
+
+        def index_lookup(query):
+            return index.search(query, INGREDIENT_SEARCH_LIMIT)
+
+        def typo_lookup(query):
+            return index.search(query[::-1], INGREDIENT_SEARCH_LIMIT)
+
+        for label, lookup in (('orm', orm_lookup),
+                              ('index', index_lookup),
+                              ('index, no prefix match', typo_lookup)):
+            mean, p95 = self._measure(lookup, queries, options['repeat'])
+            self.stdout.write(
+                f'{label:>24}: mean {mean:.3f} ms, p95 {p95:.3f} ms')
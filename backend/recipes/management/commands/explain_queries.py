@@ -0,0 +1,114 @@
+import re
+
+from django.apps import apps
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+
+from recipes.filters import RecipeFilter
+from recipes.models import Recipe, ShoppingCart, Tag
+from recipes.utils import get_ingredients_from_shopping_list
+
+
+User = get_user_model()
+
+# PostgreSQL: "Seq Scan on recipes_recipe", SQLite: "SCAN recipes_recipe"
+# (но не "SCAN recipes_recipe USING INDEX ..." и не виртуальные таблицы).
+SEQ_SCAN_PATTERNS = {
+    'postgresql': re.compile(r'Seq Scan on (\w+)'),
+    'sqlite': re.compile(
+        r'\bSCAN (?:TABLE )?(\w+)(?:(?! USING| VIRTUAL).)*$'),
+}
+
+
+class Command(BaseCommand):
+    help = ('Run EXPLAIN over the hot recipe, favorites, shopping cart and '
+            'subscription queries and flag sequential scans')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int,
+                            help='User whose lists are queried, the most '
+                                 'subscribed-to user by default')
+        parser.add_argument('--page-size', type=int,
+                            default=settings.REST_FRAMEWORK['PAGE_SIZE'])
+        parser.add_argument(
+            '--min-rows', type=int, default=1000,
+            help='Ignore sequential scans of tables with fewer rows')
+
+    def _filtered(self, params, user):
+        request = RequestFactory().get('/api/recipes/', params)
+        request.user = user
+        queryset = Recipe.objects.with_user_annotations(user)
+        return RecipeFilter(request.GET, queryset, request=request).qs
+
+    def get_workload(self, user, page_size):
+        """Запросы из представлений рецептов и подписок в виде queryset."""
+        tags = list(Tag.objects.values_list('slug', flat=True)[:2])
+        recipe = Recipe.objects.order_by('-favorites_count').first()
+        author_id = recipe.author_id if recipe else user.pk
+        recipes = Recipe.objects.with_user_annotations(user)
+        return {
+            'recipe list': recipes[:page_size],
+            'recipe list, cursor pagination':
+                recipes.order_by('-pub_date', '-id')[:page_size],
+            'recipes by author':
+                self._filtered({'author': author_id}, user)[:page_size],
+            'recipes by any tag':
+                self._filtered({'tags': tags}, user)[:page_size],
+            'recipes by all tags':
+                self._filtered({'tags': tags, 'tags_match': 'all'},
+                               user)[:page_size],
+            'favorite recipes':
+                self._filtered({'is_favorited': 1}, user)[:page_size],
+            'recipes in shopping cart':
+                self._filtered({'is_in_shopping_cart': 1}, user)[:page_size],
+            'subscriptions':
+                User.objects.filter(subscribers__user=user)
+                .with_is_subscribed(user).order_by('username')[:page_size],
+            'latest recipes of an author':
+                Recipe.objects.filter(author=author_id)[:page_size],
+            'shopping carts with a recipe':
+                ShoppingCart.objects.filter(recipe=recipe)
+                .values_list('user', flat=True),
+            'shopping list download':
+                get_ingredients_from_shopping_list(user),
+        }
+
+    def get_table_sizes(self):
+        return {model._meta.db_table: model._default_manager.count()
+                for model in apps.get_models()}
+
+    def handle(self, *args, **options):
+        pattern = SEQ_SCAN_PATTERNS.get(connection.vendor)
+        if pattern is None:
+            raise CommandError(f'EXPLAIN parsing is not supported '
+                               f'for {connection.vendor}')
+        user = (User.objects.get(pk=options['user']) if options['user']
+                else User.objects.order_by('-subscribers_count').first())
+        if user is None:
+            raise CommandError('No users, seed the database first')
+
+        table_sizes = self.get_table_sizes()
+        flagged = 0
+        workload = self.get_workload(user, options['page_size'])
+        for name, queryset in workload.items():
+            plan = queryset.explain()
+            scans = [table for line in plan.splitlines()
+                     for table in pattern.findall(line.strip())
+                     if table_sizes.get(table, 0) >= options['min_rows']]
+            if scans:
+                flagged += 1
+                self.stdout.write(self.style.WARNING(
+                    f'{name}: sequential scan on {", ".join(scans)}'))
+            else:
+                self.stdout.write(f'{name}: ok')
+            if options['verbosity'] > 1 or scans:
+                for line in plan.splitlines():
+                    self.stdout.write(f'    {line}')
+        if flagged:
+            raise CommandError(
+                f'{flagged} of {len(workload)} queries scan large tables')
+        self.stdout.write(self.style.SUCCESS(
+            f'All {len(workload)} queries use indexes'))
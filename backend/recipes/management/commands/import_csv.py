@@ -1,38 +1,140 @@
-import csv
+import os
+import sys
+import time
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 
+from recipes.caches import ingredients_cache
+from recipes.constants import IMPORT_BATCH_SIZE, IMPORT_MAX_REPORTED_ERRORS
+from recipes.importers import (READERS,
+                               InvalidRow,
+                               clean_row,
+                               get_ingredient_writer)
 from recipes.models import Ingredient
 
 
 class Command(BaseCommand):
-    help = 'Import CSV files into the database'
+    help = ('Import ingredients from a CSV, JSON or NDJSON file '
+            'into the database')
 
-    @transaction.atomic
-    def handle(self, *args, **kwargs):
-        csv_file = 'data/ingredients.csv'
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='data/ingredients.csv',
+            help='File to import, "-" reads from stdin')
+        parser.add_argument(
+            '--format', choices=READERS,
+            help='Input format, detected from the file extension by default')
+        parser.add_argument('--batch-size', type=int,
+                            default=IMPORT_BATCH_SIZE)
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Skip rows committed by a previous interrupted run')
+        parser.add_argument(
+            '--state-file',
+            help='Where to keep import progress, <path>.progress by default')
 
+    def _get_format(self, path, data_format):
+        if data_format:
+            return data_format
+        extension = os.path.splitext(path)[1].lstrip('.').lower()
+        if extension in READERS:
+            return extension
+        if path == '-':
+            return 'csv'
+        raise CommandError(f'Cannot detect format of {path}, use --format')
+
+    def _open(self, path):
+        if path == '-':
+            return open(sys.stdin.fileno(), encoding='utf-8', newline='',
+                        closefd=False)
+        return open(path, encoding='utf-8', newline='')
+
+    def _read_state(self, state_file):
         try:
-            with open(csv_file, newline='', encoding='utf-8') as csvfile:
-                reader = csv.reader(csvfile)
-                ingredients = []
-                for row in reader:
-                    if len(row) != 2:
-                        self.stderr.write(
-                            self.style.ERROR(f'Invalid row: {row}'))
-                        continue
+            with open(state_file) as file:
+                return int(file.read().strip() or 0)
+        except FileNotFoundError:
+            return 0
 
-                    name, measurement_unit = row
+    def _write_state(self, state_file, number):
+        temp_file = f'{state_file}.tmp'
+        with open(temp_file, 'w') as file:
+            file.write(str(number))
+        os.replace(temp_file, state_file)
 
-                    ingredients.append(
-                        Ingredient(name=name.strip().lower(),
-                                   measurement_unit=measurement_unit.strip())
-                    )
-                Ingredient.objects.bulk_create(ingredients,
-                                               ignore_conflicts=True)
-            self.stdout.write(
-                self.style.SUCCESS(f'Successfully imported {csvfile}')
-            )
+    def _report_error(self, number, error, count):
+        if count <= IMPORT_MAX_REPORTED_ERRORS or self.verbosity > 1:
+            self.stderr.write(self.style.ERROR(f'Row {number}: {error}'))
+
+    def handle(self, *args, **options):
+        path = options['path']
+        self.verbosity = options['verbosity']
+        reader = READERS[self._get_format(path, options['format'])]
+        state_file = options['state_file'] or (
+            None if path == '-' else f'{path}.progress')
+        if options['resume'] and not state_file:
+            raise CommandError('--resume with stdin needs --state-file')
+        skip_to = (self._read_state(state_file)
+                   if options['resume'] else 0)
+        batch_size = options['batch_size']
+
+        try:
+            stream = self._open(path)
         except FileNotFoundError:
-            self.stderr.write(self.style.ERROR(f'File {csv_file} not found'))
+            self.stderr.write(self.style.ERROR(f'File {path} not found'))
+            return
+
+        writer = get_ingredient_writer()
+        count_before = Ingredient.objects.count()
+        processed = skipped = 0
+        batch = []
+        last_number = skip_to
+        start = time.perf_counter()
+
+        def flush():
+            # Каждая пачка - отдельная транзакция, после нее запоминается
+            # номер последней строки, чтобы продолжить импорт с нее.
+            with transaction.atomic():
+                writer.write(batch)
+            if state_file:
+                self._write_state(state_file, last_number)
+            elapsed = time.perf_counter() - start
+            self.stdout.write(
+                f'{processed} rows, {skipped} skipped, '
+                f'{processed / max(elapsed, 1e-6):.0f} rows/s')
+            batch.clear()
+
+        try:
+            with stream:
+                for number, row in reader(stream):
+                    if number <= skip_to:
+                        continue
+                    if not isinstance(row, InvalidRow):
+                        row = clean_row(row)
+                    processed += 1
+                    last_number = number
+                    if isinstance(row, InvalidRow):
+                        skipped += 1
+                        self._report_error(number, row, skipped)
+                        continue
+                    batch.append(row)
+                    if len(batch) >= batch_size:
+                        flush()
+                flush()
+        except (ValueError, UnicodeDecodeError) as error:
+            raise CommandError(
+                f'Import stopped at row {last_number}: {error}')
+        finally:
+            # Новые ингредиенты должны появиться в поиске, даже если
+            # импорт прервался после нескольких пачек.
+            transaction.on_commit(ingredients_cache.bump)
+
+        if state_file and os.path.exists(state_file):
+            os.remove(state_file)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {path}: {processed} rows, '
+            f'{Ingredient.objects.count() - count_before} new ingredients, '
+            f'{skipped} skipped in {elapsed:.1f} s '
+            f'({processed / max(elapsed, 1e-6):.0f} rows/s)'))
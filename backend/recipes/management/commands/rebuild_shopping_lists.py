@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.shopping_lists import (get_live_shopping_list_totals,
+                                    get_stored_shopping_list_totals,
+                                    rebuild_shopping_lists)
+
+
+class Command(BaseCommand):
+    help = ('Rebuild the stored shopping list totals from shopping carts '
+            'or check them against the live aggregation')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only compare stored totals with the live aggregation')
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            rebuild_shopping_lists()
+            self.stdout.write(
+                self.style.SUCCESS('Shopping lists rebuilt'))
+            return
+
+        live = get_live_shopping_list_totals()
+        stored = get_stored_shopping_list_totals()
+        mismatches = 0
+        for user_id in sorted(live.keys() | stored.keys()):
+            expected = live.get(user_id, {})
+            actual = stored.get(user_id, {})
+            for ingredient_id in sorted(expected.keys() | actual.keys()):
+                if (expected.get(ingredient_id)
+                        != actual.get(ingredient_id)):
+                    mismatches += 1
+                    self.stderr.write(
+                        f'user {user_id}, ingredient {ingredient_id}: '
+                        f'expected {expected.get(ingredient_id)}, '
+                        f'stored {actual.get(ingredient_id)}')
+        if mismatches:
+            raise CommandError(
+                f'{mismatches} shopping list rows are inconsistent, '
+                'run rebuild_shopping_lists to repair them')
+        self.stdout.write(self.style.SUCCESS('Shopping lists are consistent'))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.counters import find_counter_drift, reconcile_counters
+
+
+class Command(BaseCommand):
+    help = ('Recalculate favorites, shopping cart, recipe and subscriber '
+            'counters that drifted from the relation tables')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Only report counters that differ from the live count')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['check']:
+            drift = find_counter_drift()
+            for model, field, count in drift:
+                self.stdout.write(f'{model.__name__}.{field}: {count} wrong')
+            if any(count for *_, count in drift):
+                raise CommandError(
+                    'Counters are inconsistent, run reconcile_counters '
+                    'to repair them')
+            self.stdout.write(self.style.SUCCESS('Counters are consistent'))
+            return
+
+        for model, field, count in reconcile_counters(options['batch_size']):
+            self.stdout.write(f'{model.__name__}.{field}: {count} fixed')
+        self.stdout.write(self.style.SUCCESS('Counters reconciled'))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from recipes.models import Recipe
+from recipes.short_codes import generate_short_code
+
+
+class Command(BaseCommand):
+    help = ('Fill in missing recipe short codes or, with --all, regenerate '
+            'every code from the recipe primary key')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all', action='store_true',
+            help='Also replace existing codes; old short links stop working')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.order_by('pk')
+        if not options['all']:
+            recipes = recipes.filter(
+                Q(short_code__isnull=True) | Q(short_code=''))
+        batch_size = options['batch_size']
+        if options['all']:
+            # Старые случайные коды могут совпасть с новыми, поэтому
+            # сначала они сбрасываются.
+            recipes.update(short_code=None)
+        updated = 0
+        batch = []
+        for recipe in recipes.only('pk').iterator(chunk_size=batch_size):
+            recipe.short_code = generate_short_code(recipe.pk)
+            batch.append(recipe)
+            if len(batch) >= batch_size:
+                updated += len(batch)
+                Recipe.objects.bulk_update(batch, ('short_code',))
+                batch = []
+        updated += len(batch)
+        Recipe.objects.bulk_update(batch, ('short_code',))
+        self.stdout.write(
+            self.style.SUCCESS(f'Updated short codes: {updated}'))
@@ -0,0 +1,165 @@
+import multiprocessing
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.core.management.color import no_style
+from django.db import connection, connections
+from django.db.models import Max
+
+from recipes.caches import ingredients_cache, recipes_cache, tags_cache
+from recipes.constants import SEED_BATCH_SIZE, SEED_ZIPF_EXPONENT
+from recipes.counters import reconcile_counters
+from recipes.models import Recipe
+from recipes.seeding import (LoadGenerator,
+                             create_placeholder_images,
+                             ensure_ingredients,
+                             ensure_tags,
+                             init_worker,
+                             run_chunk)
+
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = ('Fill the database with synthetic users, recipes, favorites, '
+            'shopping carts and subscriptions with Zipf-distributed '
+            'popularity. The same seed on the same starting database '
+            'produces the same data.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument(
+            '--ingredients', type=int, default=2000,
+            help='Ingredients to use, missing ones are generated')
+        parser.add_argument('--tags', type=int, default=10)
+        parser.add_argument('--favorites', type=float, default=20,
+                            help='Average favorites per user')
+        parser.add_argument('--carts', type=float, default=5,
+                            help='Average shopping cart size')
+        parser.add_argument('--subscriptions', type=float, default=10,
+                            help='Average subscriptions per user')
+        parser.add_argument(
+            '--zipf', type=float, default=SEED_ZIPF_EXPONENT,
+            help='Zipf exponent of author, recipe and ingredient '
+                 'popularity, higher means more skew')
+        parser.add_argument('--images', type=int, default=20,
+                            help='Placeholder images shared by recipes')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--prefix', default='load',
+            help='Prefix of generated usernames, tags and file names')
+        parser.add_argument('--password', default='password',
+                            help='Password of all generated users')
+        parser.add_argument('--batch-size', type=int,
+                            default=SEED_BATCH_SIZE)
+        parser.add_argument(
+            '--workers', type=int, default=1,
+            help='Parallel worker processes, PostgreSQL only')
+
+    def _check_options(self, options):
+        for name in ('users', 'recipes', 'ingredients', 'tags', 'images',
+                     'favorites', 'carts', 'subscriptions'):
+            if options[name] < 0:
+                raise CommandError(f'--{name} cannot be negative')
+        if options['recipes'] and not options['users']:
+            raise CommandError('Recipes need at least one user')
+        if options['recipes'] and not options['ingredients']:
+            raise CommandError('Recipes need at least one ingredient')
+        if options['zipf'] <= 0:
+            raise CommandError('--zipf must be positive')
+        if options['batch_size'] < 1 or options['workers'] < 1:
+            raise CommandError('--batch-size and --workers must be positive')
+        if User.objects.filter(
+                username=f'{options["prefix"]}1').exists():
+            raise CommandError(
+                f'Users with prefix {options["prefix"]} already exist, '
+                'choose another --prefix')
+
+    def _get_config(self, options):
+        prefix = options['prefix']
+        return {
+            'seed': options['seed'],
+            'prefix': prefix,
+            'zipf': options['zipf'],
+            'batch_size': options['batch_size'],
+            'users': options['users'],
+            'recipes': options['recipes'],
+            'favorites': options['favorites'],
+            'carts': options['carts'],
+            'subscriptions': options['subscriptions'],
+            # Ключи задаются явно, чтобы процессы могли ссылаться
+            # на объекты из пачек друг друга.
+            'first_user_id': (User.objects.aggregate(
+                last=Max('pk'))['last'] or 0) + 1,
+            'first_recipe_id': (Recipe.objects.aggregate(
+                last=Max('pk'))['last'] or 0) + 1,
+            'tag_ids': ensure_tags(options['tags'], prefix),
+            'ingredient_ids': ensure_ingredients(
+                options['ingredients'], prefix),
+            'images': create_placeholder_images(
+                prefix, options['images'], options['seed']),
+            # Хэширование пароля медленное, поэтому хэш общий.
+            'password': make_password(options['password']),
+        }
+
+    def _run_phases(self, config, workers):
+        if workers > 1:
+            # Дочерние процессы должны открыть свои соединения с базой.
+            connections.close_all()
+            pool = multiprocessing.get_context('fork').Pool(
+                workers, init_worker, (config,))
+            run = pool.imap_unordered
+        else:
+            pool = None
+            init_worker(config)
+            run = map
+        try:
+            for phase in LoadGenerator.phases:
+                total = LoadGenerator.get_chunk_count(config, phase)
+                rows = 0
+                start = time.perf_counter()
+                tasks = [(phase, chunk) for chunk in range(total)]
+                for done, count in enumerate(run(run_chunk, tasks), start=1):
+                    rows += count
+                    elapsed = time.perf_counter() - start
+                    self.stdout.write(
+                        f'{phase}: {done}/{total} batches, {rows} rows, '
+                        f'{rows / max(elapsed, 1e-6):.0f} rows/s')
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+    def _finalize(self, batch_size):
+        with connection.cursor() as cursor:
+            for sql in connection.ops.sequence_reset_sql(
+                    no_style(), (User, Recipe)):
+                cursor.execute(sql)
+        for model, field, count in reconcile_counters(batch_size):
+            self.stdout.write(f'{model.__name__}.{field}: {count} updated')
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        # Кэши сбрасываются явно: массовая вставка не отправляет сигналы.
+        for reference_cache in (recipes_cache, ingredients_cache, tags_cache):
+            reference_cache.bump()
+
+    def handle(self, *args, **options):
+        self._check_options(options)
+        workers = options['workers']
+        if workers > 1 and connection.vendor != 'postgresql':
+            self.stderr.write(self.style.WARNING(
+                f'{connection.vendor} does not support parallel writers, '
+                'using one worker'))
+            workers = 1
+
+        start = time.perf_counter()
+        config = self._get_config(options)
+        self._run_phases(config, workers)
+        self._finalize(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {config["users"]} users and {config["recipes"]} '
+            f'recipes in {time.perf_counter() - start:.1f} s'))
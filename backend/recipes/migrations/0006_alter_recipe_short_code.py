@@ -0,0 +1,18 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_shoppinglistingredient'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='short_code',
+            field=models.CharField(blank=True, max_length=8, null=True, unique=True),
+        ),
+    ]
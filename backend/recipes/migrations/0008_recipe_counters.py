@@ -0,0 +1,52 @@
+# Generated by Django 3.2.16 on 2026-10-18 18:04
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def live_count(model, field):
+    return Coalesce(Subquery(
+        model.objects
+        .filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(count=Count('pk'))
+        .values('count')
+    ), 0)
+
+
+def fill_counters(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    FavoriteRecipe = apps.get_model('recipes', 'FavoriteRecipe')
+    ShoppingCart = apps.get_model('recipes', 'ShoppingCart')
+    AppUser = apps.get_model('users', 'AppUser')
+    Subscribtion = apps.get_model('users', 'Subscribtion')
+    Recipe.objects.update(
+        favorites_count=live_count(FavoriteRecipe, 'recipe'),
+        in_carts_count=live_count(ShoppingCart, 'recipe'))
+    AppUser.objects.update(
+        recipes_count=live_count(Recipe, 'author'),
+        subscribers_count=live_count(Subscribtion, 'is_subscribed_to'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0007_recipe_image_renditions'),
+        ('users', '0004_appuser_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='Добавлений в избранное'),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Добавлений в список покупок'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 3.2.16 on 2026-10-18 18:06
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+INGREDIENT_NAMES_SQL = (
+    'SELECT {aggregate} FROM recipes_recipeingredient recipe_ingredient '
+    'JOIN recipes_ingredient ingredient '
+    'ON ingredient.id = recipe_ingredient.ingredient_id '
+    'WHERE recipe_ingredient.recipe_id = recipes_recipe.id')
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        ingredient_names = INGREDIENT_NAMES_SQL.format(
+            aggregate="string_agg(ingredient.name, ' ')")
+        schema_editor.execute(
+            'UPDATE recipes_recipe SET search_vector = '
+            "setweight(to_tsvector('russian', name), 'A') || "
+            "setweight(to_tsvector('russian', "
+            f"coalesce(({ingredient_names}), '')), 'B') || "
+            "setweight(to_tsvector('russian', text), 'C')")
+        schema_editor.execute(
+            'CREATE INDEX recipe_search_vector_idx ON recipes_recipe '
+            'USING gin (search_vector)')
+    elif vendor == 'sqlite':
+        ingredient_names = INGREDIENT_NAMES_SQL.format(
+            aggregate="group_concat(ingredient.name, ' ')")
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE recipes_recipe_fts '
+            'USING fts5(name, ingredients, text)')
+        schema_editor.execute(
+            'INSERT INTO recipes_recipe_fts (rowid, name, ingredients, text) '
+            f'SELECT id, name, ({ingredient_names}), text '
+            'FROM recipes_recipe')
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS recipe_search_vector_idx')
+    elif vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS recipes_recipe_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0008_recipe_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
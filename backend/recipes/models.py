@@ -1,7 +1,5 @@
-import random
-import string
-
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
 
@@ -13,6 +11,7 @@ from recipes.constants import (CODE_FOR_RECIPE_SHORT_LINK_MAX_LENGTH,
                                TAG_SLUG_MAX_LENGHT,
                                TEXT_MAX_LENGHT_FOR_ADMIN_ZONE)
 from recipes.querysets import RecipeQuerySet
+from recipes.short_codes import generate_short_code
 from recipes.validators import validate_cooking_time
 
 
@@ -60,6 +59,8 @@ class Recipe(models.Model):
         'Название', max_length=RECIPE_NAME_MAX_LENGHT)
     image = models.ImageField(
         'Фото', upload_to='recipes/images')
+    image_renditions = models.JSONField(
+        'Варианты фото', default=dict, blank=True, editable=False)
     text = models.TextField('Описание')
     cooking_time = models.PositiveIntegerField(
         'Время приготовления',
@@ -83,11 +84,26 @@ class Recipe(models.Model):
     pub_date = models.DateTimeField('Дата публикации', auto_now_add=True)
     short_code = models.CharField(
         max_length=CODE_FOR_RECIPE_SHORT_LINK_MAX_LENGTH,
-        unique=True, blank=True)
+        unique=True, blank=True, null=True)
+    favorites_count = models.PositiveIntegerField(
+        'Добавлений в избранное', default=0, editable=False, db_index=True)
+    in_carts_count = models.PositiveIntegerField(
+        'Добавлений в список покупок', default=0, editable=False)
+    # Заполняется recipes.search.update_search_index, используется
+    # только на PostgreSQL.
+    search_vector = SearchVectorField(null=True, editable=False)
 
     objects = RecipeQuerySet.as_manager()
 
     class Meta:
+        indexes = (
+            # Лента рецептов и курсорная пагинация.
+            models.Index(fields=('-pub_date', '-id'),
+                         name='recipe_pub_date_id_idx'),
+            # Рецепты автора: фильтр author и подписки с recipes_limit.
+            models.Index(fields=('author', '-pub_date'),
+                         name='recipe_author_pub_date_idx'),
+        )
         verbose_name = 'рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-pub_date',)
@@ -95,18 +111,24 @@ class Recipe(models.Model):
     def __str__(self):
         return self.name[:TEXT_MAX_LENGHT_FOR_ADMIN_ZONE]
 
-    def generate_unique_short_code(self):
-        while True:
-            short_code = ''.join(random.choices(
-                string.ascii_letters + string.digits,
-                k=CODE_FOR_RECIPE_SHORT_LINK_MAX_LENGTH))
-            if not Recipe.objects.filter(short_code=short_code).exists():
-                return short_code
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Автор нужен, чтобы при его смене перенести рецепт
+        # в счетчике recipes_count.
+        if 'author_id' in field_names:
+            instance._loaded_values = {
+                'author_id': values[field_names.index('author_id')]}
+        return instance
 
     def save(self, *args, **kwargs):
-        if not self.short_code:
-            self.short_code = self.generate_unique_short_code()
         super().save(*args, **kwargs)
+        if not self.short_code:
+            # Код вычисляется из первичного ключа, поэтому он известен
+            # только после вставки, зато уникален без проверок в базе.
+            self.short_code = generate_short_code(self.pk)
+            Recipe.objects.filter(pk=self.pk).update(
+                short_code=self.short_code)
 
 
 class RecipeIngredient(models.Model):
@@ -133,6 +155,14 @@ class RecipeIngredient(models.Model):
         verbose_name = 'ингредиент'
         verbose_name_plural = 'Ингредиенты для рецепта'
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Сохраненные значения нужны, чтобы при изменении строки обновить
+        # списки покупок на разницу в количестве.
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
 
 class RecipeTag(models.Model):
     recipe = models.ForeignKey(
@@ -146,6 +176,14 @@ class RecipeTag(models.Model):
         related_name='recipe_tags')
 
     class Meta:
+        indexes = (
+            # EXISTS фильтра по тэгам: по рецепту и тэгу без чтения строк
+            # таблицы и от тэга к рецептам, когда тэг выбран редкий.
+            models.Index(fields=('recipe', 'tag'),
+                         name='recipetag_recipe_tag_idx'),
+            models.Index(fields=('tag', 'recipe'),
+                         name='recipetag_tag_recipe_idx'),
+        )
         verbose_name = 'тэг'
         verbose_name_plural = 'Тэги рецепта'
 
@@ -185,3 +223,36 @@ class ShoppingCart(UserRecipeBase):
                 fields=('user', 'recipe'),
                 name='unique_user_recipe_in_cart'),
         )
+        indexes = (
+            # Пользователи, у которых рецепт в корзине, при изменении
+            # его ингредиентов.
+            models.Index(fields=('recipe', 'user'),
+                         name='shoppingcart_recipe_user_idx'),
+        )
+
+
+class ShoppingListIngredient(models.Model):
+    """
+    Суммарное количество ингредиента в списке покупок пользователя.
+    Обновляется при изменении списка покупок и ингредиентов рецептов
+    из него, чтобы скачивание списка не пересчитывало сумму.
+    """
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_ingredients')
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ингредиент',
+        related_name='shopping_list_ingredients')
+    amount = models.IntegerField('Количество')
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'ingredient'),
+                name='unique_user_shopping_list_ingredient'),
+        )
+        verbose_name = 'ингредиент из списка покупок'
+        verbose_name_plural = 'Ингредиенты из списков покупок'
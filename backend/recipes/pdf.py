@@ -0,0 +1,169 @@
+import zlib
+from functools import lru_cache
+from string import ascii_uppercase
+
+from reportlab.pdfbase.ttfonts import TTFontFile, makeToUnicodeCMap
+
+# Простой шрифт TrueType кодирует символ одним байтом.
+FONT_SUBSET_SIZE = 256
+
+
+@lru_cache(maxsize=None)
+def get_font(path):
+    """Разобранный файл шрифта, один на процесс для каждого пути."""
+    return TTFontFile(path)
+
+
+def get_subset_tag(number):
+    """Префикс имени подмножества шрифта: шесть заглавных букв."""
+    letters = []
+    for _ in range(6):
+        number, letter = divmod(number, len(ascii_uppercase))
+        letters.append(ascii_uppercase[letter])
+    return ''.join(reversed(letters))
+
+
+class PdfWriter:
+    """
+    Пишет PDF по частям: страница отдается, как только готова, а
+    смещения объектов запоминаются для таблицы xref в конце файла.
+    Шрифт встраивается после всех страниц подмножествами только из
+    использованных символов, поэтому кириллица не зависит от шрифтов
+    программы просмотра, а файл не содержит весь шрифт.
+    """
+
+    def __init__(self, font_path, page_size):
+        self.font = get_font(font_path)
+        self.page_size = page_size
+        self.position = 0
+        self.offsets = {}
+        self.subsets = []
+        self.codes = {}
+        self.page_numbers = []
+        self.catalog = self.reserve()
+        self.pages = self.reserve()
+        self.resources = self.reserve()
+
+    def reserve(self):
+        """Номер для объекта, который будет записан позже."""
+        self.offsets[len(self.offsets) + 1] = None
+        return len(self.offsets)
+
+    def write(self, data):
+        self.position += len(data)
+        return data
+
+    def write_object(self, number, body):
+        self.offsets[number] = self.position
+        return self.write(b'%d 0 obj\n%s\nendobj\n' % (number, body))
+
+    def write_stream(self, number, data, entries=b''):
+        data = zlib.compress(data)
+        return self.write_object(number, b'<< /Length %d /Filter /FlateDecode'
+                                 b'%s >>\nstream\n%s\nendstream'
+                                 % (len(data), entries, data))
+
+    def get_text_width(self, text, size):
+        widths = self.font.charWidths
+        default = self.font.defaultWidth
+        return sum(widths.get(ord(char), default)
+                   for char in text) * size / 1000
+
+    def encode(self, text):
+        """
+        Разбивает текст на куски [(номер подмножества, байты)]: код
+        символа - его место в подмножестве шрифта.
+        """
+        runs = []
+        for char in text:
+            if char not in self.codes:
+                if (not self.subsets
+                        or len(self.subsets[-1]) == FONT_SUBSET_SIZE):
+                    self.subsets.append([])
+                self.codes[char] = (len(self.subsets) - 1,
+                                    len(self.subsets[-1]))
+                self.subsets[-1].append(ord(char))
+            subset, code = self.codes[char]
+            if runs and runs[-1][0] == subset:
+                runs[-1][1].append(code)
+            else:
+                runs.append((subset, bytearray((code,))))
+        return runs
+
+    def begin(self):
+        return self.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def add_page(self, lines):
+        """Страница со строками [(x, y, размер шрифта, текст)]."""
+        content = []
+        for x, y, size, text in lines:
+            content.append(b'BT %.2f %.2f Td' % (x, y))
+            for subset, codes in self.encode(text):
+                content.append(b'/F%d %.2f Tf <%s> Tj'
+                               % (subset, size, codes.hex().encode()))
+            content.append(b'ET')
+        contents = self.reserve()
+        page = self.reserve()
+        self.page_numbers.append(page)
+        return self.write_stream(contents, b'\n'.join(content)) + (
+            self.write_object(page, b'<< /Type /Page /Parent %d 0 R '
+                              b'/MediaBox [0 0 %d %d] /Resources %d 0 R '
+                              b'/Contents %d 0 R >>'
+                              % (self.pages, *self.page_size,
+                                 self.resources, contents)))
+
+    def add_font_subset(self, number, subset):
+        font = self.font
+        name = (f'{get_subset_tag(number)}+'
+                f'{font.name.decode("latin-1")}').encode()
+        parts = []
+        font_file = self.reserve()
+        data = font.makeSubset(subset)
+        parts.append(self.write_stream(font_file, data,
+                                       b' /Length1 %d' % len(data)))
+        to_unicode = self.reserve()
+        parts.append(self.write_stream(
+            to_unicode, makeToUnicodeCMap(name.decode(), subset).encode()))
+        descriptor = self.reserve()
+        parts.append(self.write_object(descriptor, (
+            b'<< /Type /FontDescriptor /FontName /%s /Flags %d '
+            b'/FontBBox [%d %d %d %d] /ItalicAngle %d /Ascent %d '
+            b'/Descent %d /CapHeight %d /StemV %d /FontFile2 %d 0 R >>'
+            % (name, font.flags, *font.bbox, font.italicAngle, font.ascent,
+               font.descent, font.capHeight, font.stemV, font_file))))
+        widths = b' '.join(
+            b'%d' % font.charWidths.get(code, font.defaultWidth)
+            for code in subset)
+        reference = self.reserve()
+        parts.append(self.write_object(reference, (
+            b'<< /Type /Font /Subtype /TrueType /BaseFont /%s '
+            b'/FirstChar 0 /LastChar %d /Widths [%s] '
+            b'/FontDescriptor %d 0 R /ToUnicode %d 0 R >>'
+            % (name, len(subset) - 1, widths, descriptor, to_unicode))))
+        return reference, b''.join(parts)
+
+    def end(self):
+        """Шрифты, дерево страниц, таблица xref и трейлер."""
+        parts = []
+        fonts = []
+        for number, subset in enumerate(self.subsets):
+            reference, data = self.add_font_subset(number, subset)
+            fonts.append(b'/F%d %d 0 R' % (number, reference))
+            parts.append(data)
+        parts.append(self.write_object(
+            self.resources, b'<< /Font << %s >> >>' % b' '.join(fonts)))
+        parts.append(self.write_object(
+            self.pages, b'<< /Type /Pages /Kids [%s] /Count %d >>' % (
+                b' '.join(b'%d 0 R' % page for page in self.page_numbers),
+                len(self.page_numbers))))
+        parts.append(self.write_object(
+            self.catalog, b'<< /Type /Catalog /Pages %d 0 R >>' % self.pages))
+        xref = self.position
+        parts.append(b'xref\n0 %d\n0000000000 65535 f \n'
+                     % (len(self.offsets) + 1))
+        parts.extend(b'%010d 00000 n \n' % offset
+                     for _, offset in sorted(self.offsets.items()))
+        parts.append(b'trailer\n<< /Size %d /Root %d 0 R >>\n'
+                     b'startxref\n%d\n%%%%EOF\n'
+                     % (len(self.offsets) + 1, self.catalog, xref))
+        return b''.join(parts)
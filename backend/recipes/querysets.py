@@ -1,4 +1,6 @@
-from django.db.models import QuerySet, Exists, OuterRef, Value, BooleanField
+from django.contrib.auth import get_user_model
+from django.db.models import (QuerySet, Exists, OuterRef, Prefetch, Value,
+                              BooleanField)
 
 
 class RecipeQuerySet(QuerySet):
@@ -23,3 +25,38 @@ class RecipeQuerySet(QuerySet):
             is_favorited=Value(False, output_field=BooleanField()),
             is_in_shopping_cart=Value(False, output_field=BooleanField())
         )
+
+    def with_related_data(self, user):
+        """
+        Подгружает авторов (с флагом подписки), тэги и ингредиенты
+        с единицами измерения фиксированным числом запросов,
+        независимо от количества рецептов на странице.
+        """
+        from recipes.models import RecipeIngredient
+        authors = get_user_model().objects.with_is_subscribed(user)
+        return self.prefetch_related(
+            Prefetch('author', queryset=authors),
+            'tags',
+            Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            )
+        )
+
+    def get_user_flags(self, user):
+        """
+        Возвращает словарь {id рецепта: (в избранном, в списке покупок,
+        подписан ли пользователь на автора)} одним запросом.
+        """
+        from users.models import Subscribtion
+        return {
+            pk: flags for pk, *flags in self.with_user_annotations(user)
+            .annotate(is_author_subscribed=Exists(
+                Subscribtion.objects.filter(
+                    user=user, is_subscribed_to=OuterRef('author')
+                )
+            ))
+            .values_list('pk', 'is_favorited', 'is_in_shopping_cart',
+                         'is_author_subscribed')
+            .order_by()
+        }
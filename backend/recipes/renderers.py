@@ -0,0 +1,161 @@
+import csv
+import json
+
+from django.conf import settings
+from rest_framework.renderers import BaseRenderer
+
+from recipes.constants import (SHOPPING_LIST_CHUNK_SIZE,
+                               SHOPPING_LIST_PDF_FONT_SIZE,
+                               SHOPPING_LIST_PDF_LINE_SPACING,
+                               SHOPPING_LIST_PDF_MARGIN,
+                               SHOPPING_LIST_PDF_PAGE_SIZE,
+                               SHOPPING_LIST_PDF_TITLE_SIZE)
+from recipes.pdf import PdfWriter
+
+
+class ShoppingListRenderer(BaseRenderer):
+    """
+    Базовый класс для выгрузки списка покупок в файл.
+
+    Файл отдается потоком: stream() сначала возвращает заголовок,
+    а строки с ингредиентами выдает частями по мере чтения из базы.
+    render() используется DRF только для ответов с ошибками.
+    """
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
+
+    def render_header(self):
+        return ''
+
+    def render_item(self, number, item):
+        raise NotImplementedError
+
+    def render_footer(self):
+        return ''
+
+    def stream(self, items):
+        yield self.render_header()
+        chunk = []
+        for number, item in enumerate(items, start=1):
+            chunk.append(self.render_item(number, item))
+            if len(chunk) >= SHOPPING_LIST_CHUNK_SIZE:
+                yield ''.join(chunk)
+                chunk = []
+        chunk.append(self.render_footer())
+        yield ''.join(chunk)
+
+
+class ShoppingListTxtRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def render_header(self):
+        return 'Список покупок:\n\n'
+
+    def render_item(self, number, item):
+        return (f"{number}. {item['ingredient__name'].capitalize()} "
+                f"({item['ingredient__measurement_unit']}) - "
+                f"{item['total_amount']}\n")
+
+
+class Echo:
+    """Объект с интерфейсом файла, который возвращает записанную строку."""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingListCsvRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def __init__(self):
+        self.writer = csv.writer(Echo())
+
+    def render_header(self):
+        return self.writer.writerow(('name', 'measurement_unit', 'amount'))
+
+    def render_item(self, number, item):
+        return self.writer.writerow((item['ingredient__name'],
+                                     item['ingredient__measurement_unit'],
+                                     item['total_amount']))
+
+
+class ShoppingListJSONRenderer(ShoppingListRenderer):
+    media_type = 'application/json'
+    format = 'json'
+
+    def render_header(self):
+        return '['
+
+    def render_item(self, number, item):
+        separator = ',\n' if number > 1 else '\n'
+        return separator + json.dumps({
+            'name': item['ingredient__name'],
+            'measurement_unit': item['ingredient__measurement_unit'],
+            'amount': item['total_amount'],
+        }, ensure_ascii=False)
+
+    def render_footer(self):
+        return '\n]\n'
+
+
+class ShoppingListPdfRenderer(ShoppingListRenderer):
+    """
+    Список покупок в PDF со встроенным шрифтом SHOPPING_LIST_PDF_FONT,
+    в котором есть кириллица. Страницы отдаются по мере заполнения,
+    шрифт и оглавление документа - в конце файла.
+    """
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data, ensure_ascii=False).encode('utf-8')
+
+    def render_header(self):
+        return 'Список покупок'
+
+    def render_item(self, number, item):
+        return (f"{number}. {item['ingredient__name'].capitalize()} "
+                f"({item['ingredient__measurement_unit']}) - "
+                f"{item['total_amount']}")
+
+    def wrap(self, writer, text, size, width):
+        """Разбивает текст на строки не шире width по словам."""
+        lines = []
+        line = ''
+        for word in text.split(' '):
+            candidate = f'{line} {word}' if line else word
+            if line and writer.get_text_width(candidate, size) > width:
+                lines.append(line)
+                candidate = word
+            line = candidate
+        lines.append(line)
+        return lines
+
+    def stream(self, items):
+        writer = PdfWriter(settings.SHOPPING_LIST_PDF_FONT,
+                           SHOPPING_LIST_PDF_PAGE_SIZE)
+        page_width, page_height = SHOPPING_LIST_PDF_PAGE_SIZE
+        width = page_width - 2 * SHOPPING_LIST_PDF_MARGIN
+        top = page_height - SHOPPING_LIST_PDF_MARGIN
+        size = SHOPPING_LIST_PDF_FONT_SIZE
+        yield writer.begin()
+        lines = [(SHOPPING_LIST_PDF_MARGIN,
+                  top - SHOPPING_LIST_PDF_TITLE_SIZE,
+                  SHOPPING_LIST_PDF_TITLE_SIZE, self.render_header())]
+        y = lines[0][1] - SHOPPING_LIST_PDF_TITLE_SIZE
+        for number, item in enumerate(items, start=1):
+            for line in self.wrap(writer, self.render_item(number, item),
+                                  size, width):
+                y -= size * SHOPPING_LIST_PDF_LINE_SPACING
+                if y < SHOPPING_LIST_PDF_MARGIN:
+                    yield writer.add_page(lines)
+                    lines = []
+                    y = top - size
+                lines.append((SHOPPING_LIST_PDF_MARGIN, y, size, line))
+        yield writer.add_page(lines)
+        yield writer.end()
@@ -0,0 +1,133 @@
+import re
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (SearchQuery,
+                                            SearchRank,
+                                            SearchVector)
+from django.db import connection
+from django.db.models import F, OuterRef, Subquery, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+
+from recipes.constants import SEARCH_CONFIG
+from recipes.models import Recipe, RecipeIngredient
+
+FTS_TABLE = 'recipes_recipe_fts'
+WORD = re.compile(r'\w+')
+
+
+class SearchBackend:
+    """Поиск без полнотекстового индекса: по вхождению в название."""
+
+    def update(self, recipe_ids):
+        pass
+
+    def delete(self, recipe_ids):
+        pass
+
+    def search(self, queryset, query):
+        return queryset.filter(name__icontains=query)
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    Поиск по колонке search_vector с GIN-индексом. Название, ингредиенты
+    и описание получают разный вес, результаты сортируются по рангу.
+    """
+
+    def update(self, recipe_ids):
+        ingredient_names = Subquery(
+            RecipeIngredient.objects
+            .filter(recipe=OuterRef('pk'))
+            .order_by()
+            .values('recipe')
+            .annotate(names=StringAgg('ingredient__name', ' '))
+            .values('names'))
+        Recipe.objects.filter(pk__in=recipe_ids).update(search_vector=(
+            SearchVector('name', weight='A', config=SEARCH_CONFIG)
+            + SearchVector(Coalesce(ingredient_names, Value('')),
+                           weight='B', config=SEARCH_CONFIG)
+            + SearchVector('text', weight='C', config=SEARCH_CONFIG)))
+
+    def search(self, queryset, query):
+        search_query = SearchQuery(query, config=SEARCH_CONFIG,
+                                   search_type='websearch')
+        return (queryset.filter(search_vector=search_query)
+                .annotate(search_rank=SearchRank(F('search_vector'),
+                                                 search_query))
+                .order_by('-search_rank', '-pub_date'))
+
+
+class SqliteSearchBackend(SearchBackend):
+    """
+    Поиск по виртуальной таблице FTS5, чтобы проверять поиск локально.
+    Слова запроса ищутся как префиксы, ранг считается функцией bm25
+    с теми же приоритетами полей, что и на PostgreSQL.
+    """
+
+    def update(self, recipe_ids):
+        recipe_ids = list(recipe_ids)
+        if not recipe_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(recipe_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})',
+                recipe_ids)
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, name, ingredients, text) '
+                'SELECT recipe.id, recipe.name, '
+                '(SELECT group_concat(ingredient.name, \' \') '
+                'FROM recipes_recipeingredient recipe_ingredient '
+                'JOIN recipes_ingredient ingredient '
+                'ON ingredient.id = recipe_ingredient.ingredient_id '
+                'WHERE recipe_ingredient.recipe_id = recipe.id), '
+                'recipe.text FROM recipes_recipe recipe '
+                f'WHERE recipe.id IN ({placeholders})',
+                recipe_ids)
+
+    def delete(self, recipe_ids):
+        recipe_ids = list(recipe_ids)
+        if not recipe_ids:
+            return
+        placeholders = ', '.join(['%s'] * len(recipe_ids))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})',
+                recipe_ids)
+
+    def search(self, queryset, query):
+        words = WORD.findall(query)
+        if not words:
+            return queryset.none()
+        match = ' '.join(f'"{word}"*' for word in words)
+        rank = RawSQL(
+            f'SELECT -bm25({FTS_TABLE}, 10.0, 4.0, 1.0) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = recipes_recipe.id',
+            (match,))
+        matches = RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            (match,))
+        return (queryset.filter(pk__in=matches)
+                .annotate(search_rank=rank)
+                .order_by('-search_rank', '-pub_date'))
+
+
+def get_search_backend():
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    if connection.vendor == 'sqlite':
+        return SqliteSearchBackend()
+    return SearchBackend()
+
+
+def update_search_index(recipe_ids):
+    get_search_backend().update(recipe_ids)
+
+
+def delete_from_search_index(recipe_ids):
+    get_search_backend().delete(recipe_ids)
+
+
+def search_recipes(queryset, query):
+    return get_search_backend().search(queryset, query)
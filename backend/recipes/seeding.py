@@ -0,0 +1,322 @@
+import io
+import random
+from bisect import bisect
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.db.models import Sum
+from PIL import Image, ImageDraw
+
+from recipes.constants import (SEED_IMAGE_SIZE,
+                               SEED_MAX_SAMPLE_ATTEMPTS,
+                               SEED_PERIOD_DAYS,
+                               SEED_RECIPE_INGREDIENTS,
+                               SEED_RECIPE_TAGS)
+from recipes.models import (FavoriteRecipe,
+                            Ingredient,
+                            Recipe,
+                            RecipeIngredient,
+                            RecipeTag,
+                            ShoppingCart,
+                            ShoppingListIngredient,
+                            Tag)
+from recipes.search import update_search_index
+from recipes.short_codes import generate_short_code
+from users.models import Subscribtion
+
+User = get_user_model()
+
+# Даты публикации отсчитываются от постоянной даты, а не от текущей,
+# чтобы данные с одним seed совпадали между запусками.
+SEED_START_DATE = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+FIRST_NAMES = ('Анна', 'Иван', 'Мария', 'Петр', 'Ольга', 'Алексей',
+               'Елена', 'Дмитрий', 'Наталья', 'Сергей')
+LAST_NAMES = ('Иванова', 'Петров', 'Смирнова', 'Кузнецов', 'Попова',
+              'Соколов', 'Лебедева', 'Козлов', 'Новикова', 'Морозов')
+DISHES = ('Салат', 'Суп', 'Пирог', 'Запеканка', 'Рагу', 'Омлет', 'Паста',
+          'Каша', 'Плов', 'Блины', 'Котлеты', 'Соус')
+SENTENCES = ('Нарежьте все ингредиенты небольшими кусочками.',
+             'Разогрейте сковороду и добавьте немного масла.',
+             'Готовьте на среднем огне, время от времени помешивая.',
+             'Посолите и поперчите по вкусу.',
+             'Дайте блюду настояться несколько минут.',
+             'Подавайте горячим, украсив зеленью.')
+MEASUREMENT_UNITS = ('г', 'мл', 'шт.', 'ст. л.', 'ч. л.')
+AMOUNTS = (1, 2, 3, 5, 10, 50, 100, 150, 200, 250, 300, 500)
+
+
+class ZipfSampler:
+    """
+    Выбирает элементы с вероятностью, обратно пропорциональной рангу
+    в степени exponent: несколько элементов встречаются очень часто,
+    а большинство - редко. Ранги распределяются перемешиванием rng,
+    чтобы популярные элементы не шли подряд по первичному ключу.
+    """
+
+    def __init__(self, items, exponent, rng):
+        self.items = list(items)
+        rng.shuffle(self.items)
+        self.cum_weights = list(accumulate(
+            1 / rank ** exponent for rank in range(1, len(self.items) + 1)))
+
+    def __len__(self):
+        return len(self.items)
+
+    def sample(self, rng):
+        position = bisect(self.cum_weights,
+                          rng.random() * self.cum_weights[-1])
+        return self.items[min(position, len(self.items) - 1)]
+
+    def sample_distinct(self, rng, count, exclude=None):
+        """
+        Возвращает до count разных элементов. Редкие элементы выпадают
+        редко, поэтому число попыток ограничено и элементов может
+        получиться меньше, чем запрошено.
+        """
+        chosen = []
+        seen = {exclude}
+        for _ in range(count * SEED_MAX_SAMPLE_ATTEMPTS):
+            if len(chosen) >= count:
+                break
+            item = self.sample(rng)
+            if item not in seen:
+                seen.add(item)
+                chosen.append(item)
+        return chosen
+
+
+def make_placeholder_image(rng):
+    """Возвращает JPEG с цветным фоном и несколькими «тарелками»."""
+    width, height = SEED_IMAGE_SIZE
+    image = Image.new('RGB', SEED_IMAGE_SIZE, tuple(
+        rng.randrange(64, 256) for _ in range(3)))
+    draw = ImageDraw.Draw(image)
+    for _ in range(rng.randint(1, 4)):
+        radius = rng.randrange(height // 8, height // 3)
+        x, y = rng.randrange(width), rng.randrange(height)
+        draw.ellipse((x - radius, y - radius, x + radius, y + radius),
+                     fill=tuple(rng.randrange(256) for _ in range(3)))
+    content = io.BytesIO()
+    image.save(content, 'JPEG', quality=80)
+    return content.getvalue()
+
+
+def create_placeholder_images(prefix, count, seed):
+    """Сохраняет count изображений в хранилище и возвращает их имена."""
+    names = []
+    for number in range(count):
+        name = f'recipes/images/{prefix}_{number}.jpg'
+        if not default_storage.exists(name):
+            rng = random.Random(f'{seed}:image:{number}')
+            name = default_storage.save(
+                name, ContentFile(make_placeholder_image(rng)))
+        names.append(name)
+    return names
+
+
+def ensure_tags(count, prefix):
+    """Дополняет тэги до count и возвращает id первых count тэгов."""
+    missing = count - Tag.objects.count()
+    Tag.objects.bulk_create(
+        (Tag(name=f'{prefix} тэг {number}', slug=f'{prefix}-tag-{number}')
+         for number in range(max(missing, 0))),
+        ignore_conflicts=True)
+    return list(Tag.objects.order_by('pk').values_list('pk', flat=True)
+                [:count])
+
+
+def ensure_ingredients(count, prefix):
+    """
+    Дополняет ингредиенты, например загруженные import_csv, до count
+    и возвращает id первых count ингредиентов.
+    """
+    missing = count - Ingredient.objects.count()
+    Ingredient.objects.bulk_create(
+        (Ingredient(name=f'{prefix} ингредиент {number}',
+                    measurement_unit=MEASUREMENT_UNITS[
+                        number % len(MEASUREMENT_UNITS)])
+         for number in range(max(missing, 0))),
+        ignore_conflicts=True)
+    return list(Ingredient.objects.order_by('pk')
+                .values_list('pk', flat=True)[:count])
+
+
+def count_per_user(rng, average, limit):
+    """Число объектов у пользователя: у большинства мало, у немногих много."""
+    if not average:
+        return 0
+    return min(round(rng.expovariate(1 / average)), limit)
+
+
+@contextmanager
+def explicit_pub_date():
+    """Позволяет задать дату публикации вместо текущей в bulk_create."""
+    field = Recipe._meta.get_field('pub_date')
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class LoadGenerator:
+    """
+    Создает пользователей, рецепты и связи между ними пачками.
+
+    Пачка с номером chunk всегда содержит одни и те же объекты: первичные
+    ключи пользователей и рецептов задаются явно, а генератор случайных
+    чисел пачки зависит только от seed, этапа и номера пачки. Поэтому
+    результат не зависит от числа процессов и порядка обработки пачек.
+    """
+    phases = ('users', 'recipes', 'relations', 'search')
+    recipe_phases = ('recipes', 'search')
+
+    def __init__(self, config):
+        self.config = config
+        self.batch_size = config['batch_size']
+        self.user_ids = range(config['first_user_id'],
+                              config['first_user_id'] + config['users'])
+        self.recipe_ids = range(config['first_recipe_id'],
+                                config['first_recipe_id'] + config['recipes'])
+        rng = random.Random(f'{config["seed"]}:popularity')
+        exponent = config['zipf']
+        self.authors = ZipfSampler(self.user_ids, exponent, rng)
+        self.popular_recipes = ZipfSampler(self.recipe_ids, exponent, rng)
+        self.ingredients = ZipfSampler(config['ingredient_ids'], exponent, rng)
+
+    @classmethod
+    def get_chunk_count(cls, config, phase):
+        size = (config['recipes'] if phase in cls.recipe_phases
+                else config['users'])
+        return -(-size // config['batch_size'])
+
+    def run(self, phase, chunk):
+        """Создает объекты одной пачки и возвращает число вставленных строк."""
+        start = chunk * self.batch_size
+        ids = (self.recipe_ids if phase in self.recipe_phases
+               else self.user_ids)[start:start + self.batch_size]
+        rng = random.Random(f'{self.config["seed"]}:{phase}:{chunk}')
+        with transaction.atomic():
+            return getattr(self, f'create_{phase}')(ids, rng)
+
+    def create_users(self, user_ids, rng):
+        prefix = self.config['prefix']
+        first_number = self.user_ids[0]
+        period = timedelta(days=SEED_PERIOD_DAYS)
+        users = []
+        for user_id in user_ids:
+            number = user_id - first_number + 1
+            users.append(User(
+                pk=user_id,
+                username=f'{prefix}{number}',
+                email=f'{prefix}{number}@example.com',
+                first_name=rng.choice(FIRST_NAMES),
+                last_name=rng.choice(LAST_NAMES),
+                password=self.config['password'],
+                date_joined=SEED_START_DATE + period * rng.random()))
+        User.objects.bulk_create(users)
+        return len(users)
+
+    def create_recipes(self, recipe_ids, rng):
+        first_id = self.recipe_ids[0]
+        period = timedelta(days=SEED_PERIOD_DAYS)
+        images = self.config['images']
+        tag_ids = self.config['tag_ids']
+        recipes = []
+        recipe_ingredients = []
+        recipe_tags = []
+        for recipe_id in recipe_ids:
+            ingredient_ids = self.ingredients.sample_distinct(
+                rng, rng.randint(*SEED_RECIPE_INGREDIENTS))
+            recipes.append(Recipe(
+                pk=recipe_id,
+                author_id=self.authors.sample(rng),
+                name=f'{rng.choice(DISHES)} №{recipe_id}',
+                text=' '.join(rng.sample(SENTENCES, 3)),
+                cooking_time=rng.randint(5, 180),
+                image=rng.choice(images) if images else '',
+                short_code=generate_short_code(recipe_id),
+                pub_date=SEED_START_DATE + period * (
+                    (recipe_id - first_id) / len(self.recipe_ids))))
+            recipe_ingredients.extend(
+                RecipeIngredient(recipe_id=recipe_id,
+                                 ingredient_id=ingredient_id,
+                                 amount=rng.choice(AMOUNTS))
+                for ingredient_id in ingredient_ids)
+            recipe_tags.extend(
+                RecipeTag(recipe_id=recipe_id, tag_id=tag_id)
+                for tag_id in rng.sample(
+                    tag_ids, min(rng.randint(*SEED_RECIPE_TAGS),
+                                 len(tag_ids))))
+        with explicit_pub_date():
+            Recipe.objects.bulk_create(recipes)
+        RecipeIngredient.objects.bulk_create(recipe_ingredients)
+        RecipeTag.objects.bulk_create(recipe_tags)
+        return len(recipes) + len(recipe_ingredients) + len(recipe_tags)
+
+    def create_relations(self, user_ids, rng):
+        config = self.config
+        recipe_limit = len(self.recipe_ids) // 2
+        author_limit = len(self.user_ids) // 2
+        subscriptions = []
+        favorites = []
+        carts = []
+        for user_id in user_ids:
+            subscriptions.extend(
+                Subscribtion(user_id=user_id, is_subscribed_to_id=author_id)
+                for author_id in self.authors.sample_distinct(
+                    rng, count_per_user(rng, config['subscriptions'],
+                                        author_limit),
+                    exclude=user_id))
+            favorites.extend(
+                FavoriteRecipe(user_id=user_id, recipe_id=recipe_id)
+                for recipe_id in self.popular_recipes.sample_distinct(
+                    rng, count_per_user(rng, config['favorites'],
+                                        recipe_limit)))
+            carts.extend(
+                ShoppingCart(user_id=user_id, recipe_id=recipe_id)
+                for recipe_id in self.popular_recipes.sample_distinct(
+                    rng, count_per_user(rng, config['carts'],
+                                        recipe_limit)))
+        for model, objects in ((Subscribtion, subscriptions),
+                               (FavoriteRecipe, favorites),
+                               (ShoppingCart, carts)):
+            model.objects.bulk_create(objects)
+        # Массовая вставка не отправляет сигналы. Списков покупок у новых
+        # пользователей еще нет, поэтому они собираются одним запросом.
+        totals = (RecipeIngredient.objects
+                  .filter(recipe__shopping_cart__user__in=user_ids)
+                  .values_list('recipe__shopping_cart__user', 'ingredient')
+                  .annotate(total_amount=Sum('amount'))
+                  .order_by())
+        shopping_list = [
+            ShoppingListIngredient(user_id=user_id,
+                                   ingredient_id=ingredient_id,
+                                   amount=amount)
+            for user_id, ingredient_id, amount in totals]
+        ShoppingListIngredient.objects.bulk_create(shopping_list)
+        return (len(subscriptions) + len(favorites) + len(carts)
+                + len(shopping_list))
+
+    def create_search(self, recipe_ids, rng):
+        update_search_index(recipe_ids)
+        return len(recipe_ids)
+
+
+_generator = None
+
+
+def init_worker(config):
+    global _generator
+    _generator = LoadGenerator(config)
+
+
+def run_chunk(task):
+    phase, chunk = task
+    return _generator.run(phase, chunk)
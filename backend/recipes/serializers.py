@@ -2,12 +2,18 @@ from django.db import transaction
 from rest_framework import serializers, validators
 
 from common.serializers import Base64ImageField, ShortResipeSerializer
+from recipes.constants import RECIPE_BATCH_MAX_SIZE
 from recipes.models import (Ingredient,
                             FavoriteRecipe,
                             Recipe,
                             RecipeIngredient,
+                            RecipeTag,
                             ShoppingCart,
                             Tag)
+from recipes.search import update_search_index
+from recipes.shopping_lists import change_recipe_in_shopping_lists
+from recipes.signals import bulk_bookkeeping
+from renditions.fields import ImageRenditionsField
 from users.serializers import AppUserSerializer
 
 
@@ -35,8 +41,8 @@ class IngredientRecipeSerializers(serializers.ModelSerializer):
 
 class IngredientsAddSerialazer(serializers.ModelSerializer):
     """Сериализатор для добавления ингредиентов в рецепт."""
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all())
+    # Ингредиенты ищутся одним запросом в RecipeCreateSerializer.
+    id = serializers.IntegerField()
 
     class Meta:
         model = RecipeIngredient
@@ -56,6 +62,7 @@ class RecipeSerializer(serializers.ModelSerializer):
     ingredients = IngredientRecipeSerializers(
         source='recipe_ingredients', many=True)
     image = Base64ImageField()
+    image_renditions = ImageRenditionsField()
     tags = TagSerializer(many=True)
     is_favorited = serializers.BooleanField(default=False)
     is_in_shopping_cart = serializers.BooleanField(default=False)
@@ -63,8 +70,8 @@ class RecipeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recipe
         fields = ('id', 'tags', 'author', 'ingredients', 'is_favorited',
-                  'is_in_shopping_cart', 'name', 'image', 'text',
-                  'cooking_time')
+                  'is_in_shopping_cart', 'name', 'image', 'image_renditions',
+                  'text', 'cooking_time')
 
 
 class RecipeCreateSerializer(serializers.ModelSerializer):
@@ -72,8 +79,7 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
     ingredients = IngredientsAddSerialazer(many=True)
     image = Base64ImageField()
     tags = serializers.ListField(
-        child=serializers.PrimaryKeyRelatedField(
-            queryset=Tag.objects.all()),
+        child=serializers.IntegerField(),
         allow_empty=False
     )
 
@@ -92,14 +98,26 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 'Каждый ингредиент должен быть указан один раз.'
             )
-        return value
+        ingredients = self._get_objects(Ingredient, set_of_id,
+                                        'Ингредиенты не найдены')
+        return [{**item, 'id': ingredients[item['id']]} for item in value]
 
     def validate_tags(self, value):
         if len(set(value)) != len(value):
             raise serializers.ValidationError(
                 'Каждый тег должен быть указан один раз.'
             )
-        return value
+        tags = self._get_objects(Tag, value, 'Теги не найдены')
+        return [tags[pk] for pk in value]
+
+    def _get_objects(self, model, ids, message):
+        """Находит объекты по списку id одним запросом."""
+        objects = model.objects.in_bulk(ids)
+        missing = sorted(set(ids) - objects.keys())
+        if missing:
+            raise serializers.ValidationError(
+                f'{message}: {", ".join(map(str, missing))}.')
+        return objects
 
     def validate(self, attrs):
         errors = []
@@ -112,12 +130,63 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         return attrs
 
     def _add_ingredients_to_recipe(self, recipe, ingredients_list):
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(recipe=recipe,
+                             ingredient=ingredient['id'],
+                             amount=ingredient['amount'])
+            for ingredient in ingredients_list
+        )
+
+    def _add_tags_to_recipe(self, recipe, tags):
+        RecipeTag.objects.bulk_create(
+            RecipeTag(recipe=recipe, tag=tag) for tag in tags
+        )
+
+    def _update_recipe_ingredients(self, recipe, ingredients_list):
+        """
+        Сравнивает новый список ингредиентов с сохраненным и меняет только
+        отличающиеся строки: удаляет лишние, обновляет количество у
+        изменившихся и добавляет новые.
+        """
+        existing = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in recipe.recipe_ingredients.all()
+        }
+        to_create = []
+        to_update = []
+        changes = {}
         for ingredient in ingredients_list:
-            RecipeIngredient.objects.create(
-                recipe=recipe,
-                ingredient=ingredient['id'],
-                amount=ingredient['amount']
-            )
+            recipe_ingredient = existing.pop(ingredient['id'].id, None)
+            if recipe_ingredient is None:
+                to_create.append(ingredient)
+                changes[ingredient['id'].id] = ingredient['amount']
+            elif recipe_ingredient.amount != ingredient['amount']:
+                changes[ingredient['id'].id] = (ingredient['amount']
+                                                - recipe_ingredient.amount)
+                recipe_ingredient.amount = ingredient['amount']
+                to_update.append(recipe_ingredient)
+        if existing:
+            for recipe_ingredient in existing.values():
+                changes[recipe_ingredient.ingredient_id] = (
+                    -recipe_ingredient.amount)
+            with bulk_bookkeeping():
+                RecipeIngredient.objects.filter(
+                    pk__in=[item.pk for item in existing.values()]).delete()
+        if to_update:
+            RecipeIngredient.objects.bulk_update(to_update, ('amount',))
+        if to_create:
+            self._add_ingredients_to_recipe(recipe, to_create)
+        # Массовые операции не отправляют сигналы, поэтому списки покупок
+        # обновляются явно, одним проходом для всех изменений.
+        change_recipe_in_shopping_lists(recipe.id, changes)
+
+    def _update_recipe_tags(self, recipe, tags):
+        existing = dict(recipe.recipe_tags.values_list('tag_id', 'id'))
+        to_create = [tag for tag in tags if existing.pop(tag.id, None) is None]
+        if existing:
+            RecipeTag.objects.filter(pk__in=existing.values()).delete()
+        if to_create:
+            self._add_tags_to_recipe(recipe, to_create)
 
     @transaction.atomic
     def create(self, validated_data):
@@ -126,20 +195,27 @@ class RecipeCreateSerializer(serializers.ModelSerializer):
         author = self.context['request'].user
         recipe = Recipe.objects.create(author=author, **validated_data)
         self._add_ingredients_to_recipe(recipe, inrgedients_data)
-        recipe.tags.set(tags)
+        self._add_tags_to_recipe(recipe, tags)
+        # Ингредиенты добавлены bulk_create без сигналов, поэтому
+        # поисковый индекс обновляется явно.
+        update_search_index([recipe.id])
         return recipe
 
     @transaction.atomic
     def update(self, instance, validated_data):
         inrgedients_data = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
-        instance.ingredients.clear()
-        self._add_ingredients_to_recipe(instance, inrgedients_data)
-        instance.tags.set(tags)
+        self._update_recipe_ingredients(instance, inrgedients_data)
+        self._update_recipe_tags(instance, tags)
         super().update(instance, validated_data)
         return instance
 
     def to_representation(self, instance):
+        # Рецепт читается заново с флагами и связанными данными, чтобы
+        # ответ строился тем же числом запросов, что и в списке.
+        user = self.context['request'].user
+        instance = (Recipe.objects.with_user_annotations(user)
+                    .with_related_data(user).get(pk=instance.pk))
         return RecipeSerializer(instance, context=self.context).data
 
 
@@ -179,3 +255,17 @@ class ShoppingCartSerializer(UserRecipeBaseSerializer):
                 message='Этот рецепт уже есть в вашем списке покупок.'
             )
         ]
+
+
+class RecipeBatchSerializer(serializers.Serializer):
+    """
+    Сериализатор для списка рецептов, которые добавляются в избранное
+    или список покупок либо удаляются из них одним запросом.
+    """
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=RECIPE_BATCH_MAX_SIZE)
+
+    def validate_recipes(self, value):
+        return list(dict.fromkeys(value))
@@ -0,0 +1,137 @@
+from collections import defaultdict
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Sum, Value, When
+
+from recipes.models import (RecipeIngredient,
+                            ShoppingCart,
+                            ShoppingListIngredient)
+
+User = get_user_model()
+
+
+def lock_user_lists(user_ids):
+    """
+    Блокирует строки пользователей до конца транзакции. Изменения
+    списков покупок и избранного берут эту блокировку до записи
+    в ShoppingCart и FavoriteRecipe, и в порядке id, чтобы параллельные
+    запросы не ждали друг друга по кругу.
+    """
+    list(User.objects.select_for_update()
+         .filter(pk__in=user_ids).order_by('pk').values_list('pk'))
+
+
+def apply_shopping_list_changes(user_ids, changes):
+    """
+    Прибавляет к спискам покупок пользователей user_ids количество
+    ингредиентов из словаря changes {id ингредиента: изменение}.
+    Строки, в которых количество стало нулевым, удаляются.
+
+    Строки пользователей блокируются до конца транзакции, иначе два
+    параллельных изменения могут оба не найти строку ингредиента
+    и вставить ее дважды.
+    """
+    changes = {ingredient_id: delta
+               for ingredient_id, delta in changes.items() if delta}
+    if not user_ids or not changes:
+        return
+    with transaction.atomic():
+        lock_user_lists(user_ids)
+        rows = ShoppingListIngredient.objects.filter(
+            user__in=user_ids, ingredient__in=changes)
+        existing = set(rows.values_list('user_id', 'ingredient_id'))
+        if existing:
+            rows.update(amount=F('amount') + Case(
+                *(When(ingredient_id=ingredient_id, then=Value(delta))
+                  for ingredient_id, delta in changes.items()),
+                default=Value(0),
+                output_field=IntegerField()))
+            rows.filter(amount__lte=0).delete()
+        ShoppingListIngredient.objects.bulk_create(
+            ShoppingListIngredient(user_id=user_id,
+                                   ingredient_id=ingredient_id,
+                                   amount=delta)
+            for user_id in user_ids
+            for ingredient_id, delta in changes.items()
+            if delta > 0 and (user_id, ingredient_id) not in existing
+        )
+
+
+def get_recipes_ingredients(recipe_ids):
+    return dict(
+        RecipeIngredient.objects
+        .filter(recipe__in=recipe_ids)
+        .values_list('ingredient')
+        .annotate(total_amount=Sum('amount'))
+        .order_by()
+    )
+
+
+def add_recipes_to_shopping_list(user_id, recipe_ids):
+    apply_shopping_list_changes(
+        [user_id], get_recipes_ingredients(recipe_ids))
+
+
+def remove_recipes_from_shopping_list(user_id, recipe_ids):
+    apply_shopping_list_changes(
+        [user_id],
+        {ingredient_id: -amount for ingredient_id, amount
+         in get_recipes_ingredients(recipe_ids).items()})
+
+
+def change_recipe_in_shopping_lists(recipe_id, changes):
+    """
+    Переносит изменение ингредиентов рецепта в списки покупок всех
+    пользователей, у которых этот рецепт в корзине.
+    """
+    if not any(changes.values()):
+        return
+    user_ids = list(
+        ShoppingCart.objects.filter(recipe=recipe_id)
+        .values_list('user', flat=True))
+    apply_shopping_list_changes(user_ids, changes)
+
+
+def remove_recipe_from_shopping_lists(recipe_id):
+    """Убирает ингредиенты рецепта из списков покупок всех пользователей."""
+    change_recipe_in_shopping_lists(
+        recipe_id,
+        {ingredient_id: -amount for ingredient_id, amount
+         in get_recipes_ingredients([recipe_id]).items()})
+
+
+def get_live_shopping_list_totals():
+    """Считает списки покупок всех пользователей заново по корзинам."""
+    totals = defaultdict(dict)
+    rows = (
+        RecipeIngredient.objects
+        .filter(recipe__shopping_cart__isnull=False)
+        .values_list('recipe__shopping_cart__user', 'ingredient')
+        .annotate(total_amount=Sum('amount'))
+        .order_by()
+    )
+    for user_id, ingredient_id, amount in rows.iterator():
+        totals[user_id][ingredient_id] = amount
+    return totals
+
+
+def get_stored_shopping_list_totals():
+    totals = defaultdict(dict)
+    rows = ShoppingListIngredient.objects.values_list(
+        'user', 'ingredient', 'amount')
+    for user_id, ingredient_id, amount in rows.iterator():
+        totals[user_id][ingredient_id] = amount
+    return totals
+
+
+@transaction.atomic
+def rebuild_shopping_lists(batch_size=1000):
+    ShoppingListIngredient.objects.all().delete()
+    ShoppingListIngredient.objects.bulk_create(
+        (ShoppingListIngredient(user_id=user_id,
+                                ingredient_id=ingredient_id,
+                                amount=amount)
+         for user_id, ingredients in get_live_shopping_list_totals().items()
+         for ingredient_id, amount in ingredients.items()),
+        batch_size=batch_size)
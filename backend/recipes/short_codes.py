@@ -0,0 +1,53 @@
+import hashlib
+import hmac
+import string
+
+from django.conf import settings
+
+from recipes.constants import (SHORT_CODE_FEISTEL_ROUNDS,
+                               SHORT_CODE_MIN_LENGTH)
+
+ALPHABET = string.ascii_letters + string.digits
+BASE = len(ALPHABET)
+
+
+def _round_value(key, length, round_number, value, modulus):
+    message = f'{length}:{round_number}:{value}'.encode()
+    digest = hmac.new(key, message, hashlib.sha256).digest()
+    return int.from_bytes(digest[:8], 'big') % modulus
+
+
+def _permute(number, length, key):
+    """
+    Перемешивает числа из диапазона [0, BASE ** length) сетью Фейстеля
+    с ключом. Разные числа всегда дают разные результаты, поэтому коды,
+    полученные из первичных ключей, не пересекаются.
+    """
+    modulus = BASE ** (length // 2)
+    left, right = divmod(number, modulus)
+    for round_number in range(SHORT_CODE_FEISTEL_ROUNDS):
+        left, right = right, (
+            left + _round_value(key, length, round_number, right, modulus)
+        ) % modulus
+    return left * modulus + right
+
+
+def _encode(number, length):
+    chars = []
+    for _ in range(length):
+        number, index = divmod(number, BASE)
+        chars.append(ALPHABET[index])
+    return ''.join(reversed(chars))
+
+
+def generate_short_code(pk):
+    """
+    Возвращает короткий код рецепта по его первичному ключу без запросов
+    к базе. Длина кода четная и растет, только когда ключи перестают
+    помещаться в SHORT_CODE_MIN_LENGTH символов.
+    """
+    length = SHORT_CODE_MIN_LENGTH
+    while pk >= BASE ** length:
+        length += 2
+    key = settings.SHORT_LINK_SECRET.encode()
+    return _encode(_permute(pk, length, key), length)
@@ -0,0 +1,190 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.caches import ingredients_cache, recipes_cache, tags_cache
+from recipes.counters import change_counter, change_recipe_counter
+from recipes.models import (FavoriteRecipe,
+                            Ingredient,
+                            Recipe,
+                            RecipeIngredient,
+                            RecipeTag,
+                            ShoppingCart,
+                            Tag)
+from recipes.search import delete_from_search_index, update_search_index
+from recipes.shopping_lists import (add_recipes_to_shopping_list,
+                                    change_recipe_in_shopping_lists,
+                                    remove_recipes_from_shopping_list)
+from renditions.signals import renditions_ready
+from users.models import Subscribtion
+
+
+User = get_user_model()
+
+_bulk_bookkeeping = ContextVar('bulk_bookkeeping', default=False)
+
+
+@contextmanager
+def bulk_bookkeeping():
+    """
+    Внутри блока обработчики удаления и сохранения строк избранного,
+    списков покупок и ингредиентов рецептов не меняют счетчики, списки
+    покупок и поисковый индекс: вызывающий код делает это сам одним
+    проходом для всех строк.
+    """
+    token = _bulk_bookkeeping.set(True)
+    try:
+        yield
+    finally:
+        _bulk_bookkeeping.reset(token)
+
+
+def skip_in_bulk(handler):
+    @wraps(handler)
+    def wrapper(*args, **kwargs):
+        if not _bulk_bookkeeping.get():
+            handler(*args, **kwargs)
+    return wrapper
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredient_changed(**kwargs):
+    transaction.on_commit(ingredients_cache.bump)
+    transaction.on_commit(recipes_cache.bump)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tag_changed(**kwargs):
+    transaction.on_commit(tags_cache.bump)
+    transaction.on_commit(recipes_cache.bump)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+@receiver((post_save, post_delete), sender=RecipeTag)
+@receiver(renditions_ready, sender=Recipe)
+@receiver(renditions_ready, sender=User)
+def recipe_changed(**kwargs):
+    transaction.on_commit(recipes_cache.bump)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_search_index_changed(instance, **kwargs):
+    update_search_index([instance.pk])
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_search_index_deleted(instance, **kwargs):
+    delete_from_search_index([instance.pk])
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+@skip_in_bulk
+def recipe_ingredients_search_index_changed(instance, **kwargs):
+    update_search_index([instance.recipe_id])
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_search_index_changed(instance, created, **kwargs):
+    if not created:
+        update_search_index(
+            RecipeIngredient.objects.filter(ingredient=instance)
+            .values_list('recipe', flat=True))
+
+
+@receiver((post_save, post_delete), sender=User)
+def author_changed(update_fields=None, **kwargs):
+    # Вход пользователя обновляет только last_login, который в рецептах
+    # не показывается.
+    if update_fields and set(update_fields) <= {'last_login'}:
+        return
+    transaction.on_commit(recipes_cache.bump)
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(instance, created, **kwargs):
+    loaded_author_id = getattr(instance, '_loaded_values', {}).get(
+        'author_id')
+    if created or loaded_author_id != instance.author_id:
+        change_counter(User.objects.filter(pk=instance.author_id),
+                       'recipes_count', 1)
+    if not created and loaded_author_id not in (None, instance.author_id):
+        change_counter(User.objects.filter(pk=loaded_author_id),
+                       'recipes_count', -1)
+    instance._loaded_values = {'author_id': instance.author_id}
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(instance, **kwargs):
+    change_counter(User.objects.filter(pk=instance.author_id),
+                   'recipes_count', -1)
+
+
+@receiver(post_save, sender=Subscribtion)
+def subscription_added(instance, created, **kwargs):
+    if created:
+        change_counter(User.objects.filter(pk=instance.is_subscribed_to_id),
+                       'subscribers_count', 1)
+
+
+@receiver(post_delete, sender=Subscribtion)
+def subscription_removed(instance, **kwargs):
+    change_counter(User.objects.filter(pk=instance.is_subscribed_to_id),
+                   'subscribers_count', -1)
+
+
+@receiver(post_save, sender=FavoriteRecipe)
+@receiver(post_save, sender=ShoppingCart)
+@skip_in_bulk
+def user_recipe_relation_added(sender, instance, created, **kwargs):
+    if created:
+        change_recipe_counter(sender, [instance.recipe_id], 1)
+
+
+@receiver(post_delete, sender=FavoriteRecipe)
+@receiver(post_delete, sender=ShoppingCart)
+@skip_in_bulk
+def user_recipe_relation_removed(sender, instance, **kwargs):
+    change_recipe_counter(sender, [instance.recipe_id], -1)
+
+
+@receiver(post_save, sender=ShoppingCart)
+@skip_in_bulk
+def shopping_cart_added(instance, created, **kwargs):
+    if created:
+        add_recipes_to_shopping_list(instance.user_id, [instance.recipe_id])
+
+
+@receiver(post_delete, sender=ShoppingCart)
+@skip_in_bulk
+def shopping_cart_removed(instance, **kwargs):
+    remove_recipes_from_shopping_list(instance.user_id, [instance.recipe_id])
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@skip_in_bulk
+def recipe_ingredient_saved(instance, **kwargs):
+    loaded = getattr(instance, '_loaded_values', {})
+    changes = defaultdict(int)
+    if loaded.get('ingredient_id') is not None:
+        changes[loaded['ingredient_id']] -= loaded['amount']
+    changes[instance.ingredient_id] += instance.amount
+    change_recipe_in_shopping_lists(instance.recipe_id, changes)
+    instance._loaded_values = {'ingredient_id': instance.ingredient_id,
+                               'amount': instance.amount}
+
+
+@receiver(post_delete, sender=RecipeIngredient)
+@skip_in_bulk
+def recipe_ingredient_deleted(instance, **kwargs):
+    loaded = getattr(instance, '_loaded_values', {})
+    change_recipe_in_shopping_lists(
+        instance.recipe_id,
+        {loaded.get('ingredient_id', instance.ingredient_id):
+         -loaded.get('amount', instance.amount)})
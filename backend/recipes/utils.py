@@ -1,32 +1,36 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db.models import F
+from django.http import StreamingHttpResponse
 
-from recipes.models import (RecipeIngredient)
+from recipes.constants import SHOPPING_LIST_CHUNK_SIZE
+from recipes.models import ShoppingListIngredient
 
 
 def get_ingredients_from_shopping_list(user):
-    ingredients = (
-        RecipeIngredient.objects
-        .filter(recipe__shopping_cart__user=user)
-        .values('ingredient__name', 'ingredient__measurement_unit')
-        .annotate(total_amount=Sum('amount'))
+    return (
+        ShoppingListIngredient.objects
+        .filter(user=user)
+        .values('ingredient__name', 'ingredient__measurement_unit',
+                total_amount=F('amount'))
         .order_by('ingredient__name')
     )
-    shopping_list = [
-        f"{item['ingredient__name'].capitalize()} "
-        f"({item['ingredient__measurement_unit']}) - {item['total_amount']}"
-        for item in ingredients
-    ]
-    return shopping_list
 
 
-def download_txt(shopping_list):
-    response = HttpResponse(content_type='text/plain')
-    response['Content-Disposition'] = ('attachment; '
-                                       'filename="Список покупок.txt"')
-    response.write("Список покупок:\n\n")
-    count = 0
-    for ingredient_string in shopping_list:
-        count += 1
-        response.write(f"{count}. {ingredient_string}\n")
+def download_shopping_list(user, renderer):
+    """
+    Отдает список покупок потоком в формате renderer. Ингредиенты читаются
+    из базы частями (на PostgreSQL - через серверный курсор), поэтому
+    память не растет с размером списка, а заголовок файла уходит клиенту
+    еще до выполнения запроса.
+    """
+    ingredients = get_ingredients_from_shopping_list(user).iterator(
+        chunk_size=SHOPPING_LIST_CHUNK_SIZE)
+    content_type = renderer.media_type
+    if renderer.charset:
+        content_type = f'{content_type}; charset={renderer.charset}'
+    response = StreamingHttpResponse(renderer.stream(ingredients),
+                                     content_type=content_type)
+    response['Content-Disposition'] = (
+        f'attachment; filename="Список покупок.{renderer.format}"')
+    # Отключает буферизацию ответа в nginx, чтобы файл шел клиенту частями.
+    response['X-Accel-Buffering'] = 'no'
     return response
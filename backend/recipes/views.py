@@ -1,3 +1,6 @@
+from django.contrib.auth.models import AnonymousUser
+from django.db import transaction
+from django.db.models import Exists, OuterRef
 from django.shortcuts import get_object_or_404, redirect
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status, viewsets
@@ -6,7 +9,15 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from recipes.filters import RecipeFilter, IngredientSearchFilter
+from common.cache import CachedReadOnlyMixin
+from common.pagination import CursorPaginationMixin
+from common.views import AsyncReadMixin
+from recipes.autocomplete import get_ingredient_index, normalize
+from recipes.caches import ingredients_cache, recipes_cache, tags_cache
+from recipes.constants import (INGREDIENT_SEARCH_LIMIT,
+                               INGREDIENT_SEARCH_MAX_LIMIT)
+from recipes.counters import change_recipe_counter
+from recipes.filters import RecipeFilter
 from recipes.models import (FavoriteRecipe,
                             Ingredient,
                             Recipe,
@@ -15,48 +26,179 @@ from recipes.models import (FavoriteRecipe,
 from recipes.permissions import IsAuthorOrReadOnly
 from recipes.serializers import (FavoriteRecipeSerializer,
                                  IngredientSerializer,
+                                 RecipeBatchSerializer,
                                  RecipeCreateSerializer,
                                  RecipeSerializer,
                                  ShoppingCartSerializer,
                                  TagSerializer)
-from recipes.utils import (download_txt,
-                           get_ingredients_from_shopping_list)
+from recipes.renderers import (ShoppingListCsvRenderer,
+                               ShoppingListJSONRenderer,
+                               ShoppingListPdfRenderer,
+                               ShoppingListTxtRenderer)
+from recipes.shopping_lists import (add_recipes_to_shopping_list,
+                                    lock_user_lists,
+                                    remove_recipe_from_shopping_lists,
+                                    remove_recipes_from_shopping_list)
+from recipes.signals import bulk_bookkeeping
+from recipes.utils import download_shopping_list
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+RECIPE_NOT_FOUND_MESSAGE = 'Рецепт не найден.'
+RECIPE_NOT_IN_LIST_MESSAGE = 'Этого рецепта нет в вашем списке.'
+
+
+class IngredientViewSet(AsyncReadMixin, CachedReadOnlyMixin,
+                        viewsets.ReadOnlyModelViewSet):
     """Класс для обработки всех запросов, связанных с ингредиентами."""
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     pagination_class = None
-    filter_backends = (IngredientSearchFilter,)
-    search_fields = ('^name',)
+    reference_cache = ingredients_cache
+
+    def get_search_limit(self):
+        try:
+            limit = int(self.request.query_params['limit'])
+        except (KeyError, ValueError):
+            return INGREDIENT_SEARCH_LIMIT
+        return min(max(limit, 1), INGREDIENT_SEARCH_MAX_LIMIT)
+
+    def get_cache_key(self):
+        if self.action == 'list':
+            return (self.action,
+                    normalize(self.request.query_params.get('name', '')),
+                    self.get_search_limit())
+        return super().get_cache_key()
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(self.search, request)
+
+    def search(self, request):
+        """
+        Подсказки по параметру name ищутся в индексе ингредиентов
+        в памяти процесса, без запросов к базе и сериализатора.
+        """
+        ingredients = get_ingredient_index().search(
+            request.query_params.get('name', ''), self.get_search_limit())
+        return Response(ingredients)
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(AsyncReadMixin, CachedReadOnlyMixin,
+                 viewsets.ReadOnlyModelViewSet):
     """Класс для обработки всех запросов, связанных с тегами."""
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     pagination_class = None
+    reference_cache = tags_cache
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(AsyncReadMixin, CursorPaginationMixin,
+                    viewsets.ModelViewSet):
     """Класс для обработки всех запросов, связанных с рецептами."""
     serializer_class = RecipeSerializer
     permission_classes = (IsAuthorOrReadOnly,)
     http_method_names = ('get', 'post', 'patch', 'delete')
     filter_backends = (DjangoFilterBackend,)
     filterset_class = RecipeFilter
+    # Поиск сортирует по релевантности, курсор - по дате публикации.
+    cursor_incompatible_params = ('search',)
+
+    shared_page = False
+    user_filters = ('is_favorited', 'is_in_shopping_cart')
 
     def get_queryset(self):
-        return Recipe.objects.with_user_annotations(self.request.user)
+        user = AnonymousUser() if self.shared_page else self.request.user
+        queryset = Recipe.objects.with_user_annotations(user)
+        if self.action in ('list', 'retrieve'):
+            return queryset.with_related_data(user)
+        return queryset
+
+    def get_page_cache_key(self):
+        """
+        Ключ страницы списка в recipes_cache или None, если страница
+        отфильтрована по избранному или списку покупок. Для анонимов эти
+        фильтры не применяются, но остаются в ссылках next и previous,
+        поэтому такие страницы не кэшируются ни для кого.
+        """
+        params = self.request.query_params
+        if any(params.get(name) for name in self.user_filters):
+            return None
+        return (self.request.build_absolute_uri(self.request.path),
+                tuple(sorted((name, tuple(values))
+                             for name, values in params.lists())))
+
+    def get_shared_page(self, request, *args, **kwargs):
+        """Страница списка рецептов без флагов, зависящих от пользователя."""
+        self.shared_page = True
+        try:
+            data = super().list(request, *args, **kwargs).data
+        finally:
+            self.shared_page = False
+        # Список результатов копируется, чтобы кэш не держал сериализатор
+        # и объекты моделей.
+        return {**data, 'results': list(data['results'])}
+
+    def add_user_flags(self, data):
+        user = self.request.user
+        if not user.is_authenticated or not data['results']:
+            return data
+        flags = Recipe.objects.filter(
+            pk__in=[recipe['id'] for recipe in data['results']]
+        ).get_user_flags(user)
+        results = []
+        for recipe in data['results']:
+            is_favorited, is_in_shopping_cart, is_subscribed = flags.get(
+                recipe['id'], (False, False, False))
+            results.append({
+                **recipe,
+                'author': {**recipe['author'], 'is_subscribed': is_subscribed},
+                'is_favorited': is_favorited,
+                'is_in_shopping_cart': is_in_shopping_cart,
+            })
+        return {**data, 'results': results}
+
+    def list(self, request, *args, **kwargs):
+        """
+        Общая для всех пользователей часть страницы берется из кэша,
+        а флаги избранного, списка покупок и подписки на автора
+        подставляются одним запросом для текущего пользователя.
+        """
+        key = self.get_page_cache_key()
+        if key is None:
+            return super().list(request, *args, **kwargs)
+        data = recipes_cache.get(
+            key, lambda: self.get_shared_page(request, *args, **kwargs))
+        return Response(self.add_user_flags(data))
 
     def get_serializer_class(self):
         if self.action in ('list', 'retrieve'):
             return RecipeSerializer
         return RecipeCreateSerializer
 
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        """
+        При каскадном удалении сигналы отправляются для каждой строки
+        избранного, списков покупок и ингредиентов рецепта. Поэтому
+        списки покупок обновляются одним проходом, а обработчики этих
+        строк ничего не делают.
+        """
+        remove_recipe_from_shopping_lists(instance.pk)
+        with bulk_bookkeeping():
+            instance.delete()
+
+    def _lock_user_list(self, user):
+        """
+        Список покупок меняется на разницу, а счетчики рецептов - на
+        число добавленных строк, поэтому параллельные запросы одного
+        пользователя к избранному и корзине выполняются по очереди.
+        Блокировка берется до записи, как и в сигнале после нее.
+        """
+        lock_user_lists([user.pk])
+
+    @transaction.atomic
     def _create_user_recipe_relations(self, serialiser, recipe_pk, request):
         recipe = get_object_or_404(Recipe, pk=recipe_pk)
+        self._lock_user_list(request.user)
         data = {
             'user': request.user.id,
             'recipe': recipe.id
@@ -66,17 +208,88 @@ class RecipeViewSet(viewsets.ModelViewSet):
         serializer.save()
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
+    @transaction.atomic
     def _delete_user_recipe_relations(self, model, recipe_pk, request):
         user = request.user
         recipe = get_object_or_404(Recipe, pk=recipe_pk)
+        self._lock_user_list(user)
         deleted_count, _ = model.objects.filter(
             user=user, recipe=recipe).delete()
         if deleted_count > 0:
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response(
-            {'errors': 'Этого рецепта нет в вашем списке.'},
+            {'errors': RECIPE_NOT_IN_LIST_MESSAGE},
             status=status.HTTP_400_BAD_REQUEST)
 
+    def _get_batch_recipes(self, model, request):
+        """
+        Возвращает список id рецептов из запроса и словарь
+        {id найденного рецепта: есть ли он уже в списке model}.
+        """
+        serializer = RecipeBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        recipe_ids = serializer.validated_data['recipes']
+        self._lock_user_list(request.user)
+        found = dict(
+            Recipe.objects.filter(pk__in=recipe_ids)
+            .annotate(is_added=Exists(model.objects.filter(
+                user=request.user, recipe=OuterRef('pk'))))
+            .order_by()
+            .values_list('pk', 'is_added'))
+        return recipe_ids, found
+
+    @transaction.atomic
+    def _create_user_recipe_relations_batch(self, model, request,
+                                            exists_message):
+        recipe_ids, found = self._get_batch_recipes(model, request)
+        added = [pk for pk in recipe_ids if found.get(pk) is False]
+        # Без ignore_conflicts: под блокировкой пользователя added точен,
+        # а чужая вставка той же строки отменит запрос, а не счетчики.
+        model.objects.bulk_create(
+            model(user=request.user, recipe_id=pk) for pk in added)
+        # Массовые операции не отправляют сигналы, поэтому счетчики
+        # и список покупок обновляются явно.
+        if added:
+            change_recipe_counter(model, added, 1)
+        if added and model is ShoppingCart:
+            add_recipes_to_shopping_list(request.user.id, added)
+        results = []
+        for pk in recipe_ids:
+            if pk not in found:
+                results.append({'id': pk, 'status': 'not_found',
+                                'errors': RECIPE_NOT_FOUND_MESSAGE})
+            elif found[pk]:
+                results.append({'id': pk, 'status': 'exists',
+                                'errors': exists_message})
+            else:
+                results.append({'id': pk, 'status': 'added'})
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
+    @transaction.atomic
+    def _delete_user_recipe_relations_batch(self, model, request):
+        recipe_ids, found = self._get_batch_recipes(model, request)
+        removed = [pk for pk in recipe_ids if found.get(pk)]
+        if removed:
+            # Счетчики и список покупок пересчитываются один раз для всех
+            # рецептов, а не в обработчике post_delete каждой строки.
+            with bulk_bookkeeping():
+                model.objects.filter(
+                    user=request.user, recipe__in=removed).delete()
+            change_recipe_counter(model, removed, -1)
+            if model is ShoppingCart:
+                remove_recipes_from_shopping_list(request.user.id, removed)
+        results = []
+        for pk in recipe_ids:
+            if pk not in found:
+                results.append({'id': pk, 'status': 'not_found',
+                                'errors': RECIPE_NOT_FOUND_MESSAGE})
+            elif not found[pk]:
+                results.append({'id': pk, 'status': 'missing',
+                                'errors': RECIPE_NOT_IN_LIST_MESSAGE})
+            else:
+                results.append({'id': pk, 'status': 'removed'})
+        return Response({'results': results}, status=status.HTTP_200_OK)
+
     @action(methods=('post',), detail=True,
             permission_classes=(IsAuthenticated,))
     def favorite(self, request, pk=None):
@@ -97,20 +310,50 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def delete_shopping_cart(self, request, pk=None):
         return self._delete_user_recipe_relations(ShoppingCart, pk, request)
 
+    @action(methods=('post',), detail=False, url_path='favorite',
+            url_name='favorite-batch',
+            permission_classes=(IsAuthenticated,))
+    def favorite_batch(self, request):
+        return self._create_user_recipe_relations_batch(
+            FavoriteRecipe, request,
+            'Этот рецепт уже есть в вашем списке избранного.')
+
+    @favorite_batch.mapping.delete
+    def delete_favorite_batch(self, request):
+        return self._delete_user_recipe_relations_batch(
+            FavoriteRecipe, request)
+
+    @action(methods=('post',), detail=False, url_path='shopping_cart',
+            url_name='shopping-cart-batch',
+            permission_classes=(IsAuthenticated,))
+    def shopping_cart_batch(self, request):
+        return self._create_user_recipe_relations_batch(
+            ShoppingCart, request,
+            'Этот рецепт уже есть в вашем списке покупок.')
+
+    @shopping_cart_batch.mapping.delete
+    def delete_shopping_cart_batch(self, request):
+        return self._delete_user_recipe_relations_batch(
+            ShoppingCart, request)
+
     @action(methods=('get',), detail=True, url_path='get-link')
     def get_link(self, request, pk=None):
         recipe = get_object_or_404(Recipe, pk=pk)
         short_link = request.build_absolute_uri(f'/s/{recipe.short_code}/')
         return Response({'short-link': short_link}, status=status.HTTP_200_OK)
 
-    @action(methods=('get',), detail=False)
+    @action(methods=('get',), detail=False,
+            permission_classes=(IsAuthenticated,),
+            renderer_classes=(ShoppingListTxtRenderer,
+                              ShoppingListCsvRenderer,
+                              ShoppingListJSONRenderer,
+                              ShoppingListPdfRenderer))
     def download_shopping_cart(self, request):
-        self.permission_classes = (IsAuthenticated,)
-        shopping_list = get_ingredients_from_shopping_list(request.user)
-        return download_txt(shopping_list)
+        return download_shopping_list(request.user,
+                                      request.accepted_renderer)
 
 
-class RecipeShortLinkRedirectView(APIView):
+class RecipeShortLinkRedirectView(AsyncReadMixin, APIView):
     """
     Класс для обработки коротких ссылок на рецепты и
     и редиректа на нужный рецепт.
@@ -0,0 +1,12 @@
+from django.contrib import admin
+
+from renditions.models import RenditionTask
+
+
+@admin.register(RenditionTask)
+class RenditionTaskAdmin(admin.ModelAdmin):
+    list_display = ('model', 'object_id', 'source', 'status',
+                    'attempts', 'created')
+    list_filter = ('status', 'model')
+    search_fields = ('source',)
+    readonly_fields = ('created', 'locked_at', 'error')
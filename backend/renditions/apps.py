@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class RenditionsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'renditions'
+    verbose_name = 'Варианты изображений'
+
+    def ready(self):
+        import renditions.signals  # noqa: F401
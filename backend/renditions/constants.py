@@ -0,0 +1,31 @@
+RENDITIONS_UPLOAD_DIR = 'renditions'
+RENDITION_MAX_ATTEMPTS = 3
+RENDITION_LOCK_TIMEOUT = 10 * 60
+RENDITION_BATCH_SIZE = 20
+RENDITION_POLL_INTERVAL = 2
+RENDITION_ERROR_MAX_LENGTH = 1000
+JPEG_QUALITY = 85
+WEBP_QUALITY = 80
+
+# Для каждой модели: поле с исходным изображением, поле, в котором
+# хранятся имена готовых файлов, и набор вариантов. Размер None
+# означает, что изображение только перекодируется.
+IMAGE_RENDITIONS = {
+    'recipes.Recipe': {
+        'field': 'image',
+        'renditions_field': 'image_renditions',
+        'renditions': {
+            'thumbnail': {'size': (480, 480), 'format': 'JPEG'},
+            'thumbnail_webp': {'size': (480, 480), 'format': 'WEBP'},
+            'webp': {'size': None, 'format': 'WEBP'},
+        },
+    },
+    'users.AppUser': {
+        'field': 'avatar',
+        'renditions_field': 'avatar_renditions',
+        'renditions': {
+            'thumbnail': {'size': (160, 160), 'format': 'JPEG'},
+            'thumbnail_webp': {'size': (160, 160), 'format': 'WEBP'},
+        },
+    },
+}
@@ -0,0 +1,31 @@
+from rest_framework import serializers
+
+from renditions.constants import IMAGE_RENDITIONS
+
+
+class ImageRenditionsField(serializers.Field):
+    """
+    Ссылки на варианты изображения объекта. Пока обработчик не создал
+    варианты для текущего файла, вместо каждого отдается оригинал.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        spec = IMAGE_RENDITIONS[instance._meta.label]
+        image = getattr(instance, spec['field'])
+        if not image:
+            return None
+        renditions = getattr(instance, spec['renditions_field']) or {}
+        if renditions.get('source') != image.name:
+            renditions = {}
+        request = self.context.get('request')
+        urls = {}
+        for name in spec['renditions']:
+            url = (image.storage.url(renditions[name])
+                   if name in renditions else image.url)
+            urls[name] = request.build_absolute_uri(url) if request else url
+        return urls
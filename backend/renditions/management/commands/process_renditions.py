@@ -0,0 +1,52 @@
+import os
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from renditions.constants import (RENDITION_BATCH_SIZE,
+                                  RENDITION_POLL_INTERVAL)
+from renditions.processing import (claim_tasks,
+                                   enqueue_missing_renditions,
+                                   run_task)
+
+
+class Command(BaseCommand):
+    help = ('Create thumbnails and WebP variants of uploaded images '
+            'from the rendition task queue')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int,
+                            default=min(4, os.cpu_count() or 1))
+        parser.add_argument('--batch-size', type=int,
+                            default=RENDITION_BATCH_SIZE)
+        parser.add_argument('--poll-interval', type=float,
+                            default=RENDITION_POLL_INTERVAL)
+        parser.add_argument('--once', action='store_true',
+                            help='Exit when the queue is empty')
+        parser.add_argument('--enqueue-missing', action='store_true',
+                            help='Queue existing images without variants')
+
+    def handle(self, *args, **options):
+        if options['enqueue_missing']:
+            count = enqueue_missing_renditions(options['batch_size'])
+            self.stdout.write(f'Queued {count} images')
+        totals = Counter()
+        with ThreadPoolExecutor(options['workers']) as pool:
+            while True:
+                close_old_connections()
+                task_ids = claim_tasks(options['batch_size'])
+                if not task_ids:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+                statuses = Counter(pool.map(run_task, task_ids))
+                totals.update(statuses)
+                self.stdout.write(', '.join(
+                    f'{status}: {count}'
+                    for status, count in sorted(statuses.items())))
+        self.stdout.write(self.style.SUCCESS(
+            f'Processed {sum(totals.values())} tasks'))
@@ -0,0 +1,41 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RenditionTask',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=100, verbose_name='Модель')),
+                ('object_id', models.PositiveBigIntegerField(verbose_name='ID объекта')),
+                ('source', models.CharField(max_length=255, verbose_name='Исходный файл')),
+                ('status', models.CharField(choices=[('pending', 'В очереди'), ('processing', 'Обрабатывается'), ('done', 'Готово'), ('failed', 'Ошибка')], default='pending', max_length=20, verbose_name='Статус')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Попытки')),
+                ('error', models.TextField(blank=True, verbose_name='Ошибка')),
+                ('created', models.DateTimeField(auto_now_add=True, verbose_name='Создана')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='Взята в работу')),
+            ],
+            options={
+                'verbose_name': 'задача обработки изображения',
+                'verbose_name_plural': 'Задачи обработки изображений',
+                'ordering': ('-id',),
+            },
+        ),
+        migrations.AddIndex(
+            model_name='renditiontask',
+            index=models.Index(fields=['status', 'id'], name='rendition_task_status_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='renditiontask',
+            constraint=models.UniqueConstraint(fields=('model', 'object_id', 'source'), name='unique_rendition_task'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+from django.db import models
+
+
+class RenditionTask(models.Model):
+    """
+    Задача на создание вариантов изображения. Таблица служит очередью
+    для обработчиков process_renditions, отдельный брокер не нужен.
+    """
+    PENDING = 'pending'
+    PROCESSING = 'processing'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (PENDING, 'В очереди'),
+        (PROCESSING, 'Обрабатывается'),
+        (DONE, 'Готово'),
+        (FAILED, 'Ошибка'),
+    )
+
+    model = models.CharField('Модель', max_length=100)
+    object_id = models.PositiveBigIntegerField('ID объекта')
+    source = models.CharField('Исходный файл', max_length=255)
+    status = models.CharField(
+        'Статус', max_length=20, choices=STATUSES, default=PENDING)
+    attempts = models.PositiveSmallIntegerField('Попытки', default=0)
+    error = models.TextField('Ошибка', blank=True)
+    created = models.DateTimeField('Создана', auto_now_add=True)
+    locked_at = models.DateTimeField('Взята в работу', blank=True, null=True)
+
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('model', 'object_id', 'source'),
+                name='unique_rendition_task',
+            ),
+        )
+        indexes = (
+            models.Index(fields=('status', 'id'),
+                         name='rendition_task_status_idx'),
+        )
+        verbose_name = 'задача обработки изображения'
+        verbose_name_plural = 'Задачи обработки изображений'
+        ordering = ('-id',)
+
+    def __str__(self):
+        return f'{self.model} #{self.object_id}: {self.source}'
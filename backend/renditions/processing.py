@@ -0,0 +1,201 @@
+import os
+from datetime import timedelta
+from functools import partial
+from io import BytesIO
+
+from django.apps import apps
+from django.core.files.base import ContentFile
+from django.db import close_old_connections
+from django.db.models import F
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from renditions.constants import (IMAGE_RENDITIONS,
+                                  JPEG_QUALITY,
+                                  RENDITION_ERROR_MAX_LENGTH,
+                                  RENDITION_LOCK_TIMEOUT,
+                                  RENDITION_MAX_ATTEMPTS,
+                                  RENDITIONS_UPLOAD_DIR,
+                                  WEBP_QUALITY)
+from renditions.models import RenditionTask
+from renditions.signals import renditions_ready
+
+FORMAT_OPTIONS = {
+    'JPEG': ('jpg', {'quality': JPEG_QUALITY, 'optimize': True,
+                     'progressive': True}),
+    'WEBP': ('webp', {'quality': WEBP_QUALITY, 'method': 4}),
+}
+
+
+def open_image(file):
+    """
+    Открывает изображение с учетом поворота из EXIF. У анимаций
+    берется первый кадр, палитра переводится в RGB или RGBA.
+    """
+    image = Image.open(file)
+    image.load()
+    image = ImageOps.exif_transpose(image)
+    has_alpha = (image.mode in ('RGBA', 'LA', 'PA')
+                 or 'transparency' in image.info)
+    return image.convert('RGBA' if has_alpha else 'RGB')
+
+
+def render_rendition(image, size, image_format):
+    extension, options = FORMAT_OPTIONS[image_format]
+    image = image.copy()
+    if size:
+        image.thumbnail(size, Image.LANCZOS)
+    if image_format == 'JPEG' and image.mode == 'RGBA':
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        image = background
+    buffer = BytesIO()
+    image.save(buffer, image_format, **options)
+    return extension, buffer.getvalue()
+
+
+def save_rendition(storage, name, render):
+    """
+    Сохраняет вариант под именем name, если его еще нет. Имена
+    вариантов зависят только от исходного файла, поэтому повторная
+    обработка и объекты с общим изображением используют готовый файл,
+    а не создают копию с суффиксом.
+    """
+    if storage.exists(name):
+        return name
+    saved_name = storage.save(name, ContentFile(render()))
+    if saved_name != name:
+        # Тот же вариант успел сохранить другой обработчик.
+        storage.delete(saved_name)
+    return name
+
+
+def delete_unused_renditions(model, spec, storage, renditions):
+    """
+    Удаляет файлы прежних вариантов объекта, если их исходное
+    изображение больше не стоит ни у одного объекта.
+    """
+    source = renditions.get('source')
+    if not source or model._default_manager.filter(
+            **{spec['field']: source}).exists():
+        return
+    for name in spec['renditions']:
+        if renditions.get(name):
+            storage.delete(renditions[name])
+
+
+def process_task(task):
+    """
+    Создает варианты изображения и сохраняет их имена в объекте.
+    Если изображение успели заменить или объект удален, задача
+    считается выполненной без обработки.
+    """
+    model = apps.get_model(task.model)
+    spec = IMAGE_RENDITIONS[task.model]
+    queryset = model._default_manager.filter(
+        pk=task.object_id, **{spec['field']: task.source})
+    previous = list(queryset.values_list(spec['renditions_field'],
+                                         flat=True))
+    if not previous:
+        return
+    storage = model._meta.get_field(spec['field']).storage
+    image = None
+
+    def render(size, image_format):
+        nonlocal image
+        if image is None:
+            with storage.open(task.source) as file:
+                image = open_image(file)
+        return render_rendition(image, size, image_format)[1]
+
+    base_name = os.path.join(RENDITIONS_UPLOAD_DIR,
+                             os.path.splitext(task.source)[0])
+    renditions = {'source': task.source}
+    for name, options in spec['renditions'].items():
+        extension = FORMAT_OPTIONS[options['format']][0]
+        renditions[name] = save_rendition(
+            storage, f'{base_name}/{name}.{extension}',
+            partial(render, options['size'], options['format']))
+    # update не вызывает post_save, поэтому задача не встанет в очередь
+    # повторно, а кэши сбрасываются по сигналу renditions_ready.
+    if queryset.update(**{spec['renditions_field']: renditions}):
+        renditions_ready.send(sender=model, object_id=task.object_id,
+                              renditions=renditions)
+        delete_unused_renditions(model, spec, storage, previous[0] or {})
+
+
+def run_task(task_id):
+    """
+    Выполняет задачу и возвращает ее новый статус. Задачи выполняются
+    в потоках пула, которые живут долго, поэтому соединение потока
+    с базой закрывается, как после HTTP-запроса: по CONN_MAX_AGE
+    и после ошибок, например после перезапуска базы.
+    """
+    close_old_connections()
+    try:
+        return _run_task(task_id)
+    finally:
+        close_old_connections()
+
+
+def _run_task(task_id):
+    task = RenditionTask.objects.get(pk=task_id)
+    try:
+        process_task(task)
+    except Exception as error:
+        status = (RenditionTask.FAILED
+                  if task.attempts >= RENDITION_MAX_ATTEMPTS
+                  else RenditionTask.PENDING)
+        RenditionTask.objects.filter(pk=task.pk).update(
+            status=status, locked_at=None,
+            error=repr(error)[:RENDITION_ERROR_MAX_LENGTH])
+        return status
+    RenditionTask.objects.filter(pk=task.pk).update(
+        status=RenditionTask.DONE, locked_at=None, error='')
+    return RenditionTask.DONE
+
+
+def claim_tasks(limit):
+    """
+    Забирает до limit задач из очереди. Задача считается взятой, только
+    если условный UPDATE изменил строку, поэтому несколько обработчиков
+    не получат одну задачу и без SELECT FOR UPDATE. Задачи, которые
+    обрабатываются дольше RENDITION_LOCK_TIMEOUT, возвращаются в очередь.
+    """
+    now = timezone.now()
+    stale = RenditionTask.objects.filter(
+        status=RenditionTask.PROCESSING,
+        locked_at__lt=now - timedelta(seconds=RENDITION_LOCK_TIMEOUT))
+    stale.filter(attempts__gte=RENDITION_MAX_ATTEMPTS).update(
+        status=RenditionTask.FAILED, locked_at=None)
+    stale.update(status=RenditionTask.PENDING, locked_at=None)
+    candidates = (RenditionTask.objects.filter(status=RenditionTask.PENDING)
+                  .order_by('id').values_list('id', flat=True)[:limit])
+    claimed = []
+    for task_id in candidates:
+        if RenditionTask.objects.filter(
+                pk=task_id, status=RenditionTask.PENDING).update(
+                    status=RenditionTask.PROCESSING, locked_at=now,
+                    attempts=F('attempts') + 1):
+            claimed.append(task_id)
+    return claimed
+
+
+def enqueue_missing_renditions(batch_size):
+    """Ставит в очередь все изображения, у которых нет вариантов."""
+    count = 0
+    for label, spec in IMAGE_RENDITIONS.items():
+        model = apps.get_model(label)
+        field, renditions_field = spec['field'], spec['renditions_field']
+        objects = (model._default_manager.exclude(**{field: ''})
+                   .exclude(**{f'{field}__isnull': True})
+                   .values_list('pk', field, renditions_field))
+        tasks = [
+            RenditionTask(model=label, object_id=pk, source=source)
+            for pk, source, renditions in objects.iterator(batch_size)
+            if (renditions or {}).get('source') != source
+        ]
+        RenditionTask.objects.bulk_create(
+            tasks, batch_size=batch_size, ignore_conflicts=True)
+        count += len(tasks)
+    return count
@@ -0,0 +1,30 @@
+from django.db.models.signals import post_save
+from django.dispatch import Signal
+
+from renditions.constants import IMAGE_RENDITIONS
+from renditions.models import RenditionTask
+
+# Отправляется обработчиком, когда варианты изображения сохранены
+# в объекте. Аргументы: object_id и renditions.
+renditions_ready = Signal()
+
+
+def image_saved(sender, instance, **kwargs):
+    """Ставит в очередь изображение, для которого еще нет вариантов."""
+    spec = IMAGE_RENDITIONS[sender._meta.label]
+    image = getattr(instance, spec['field'])
+    renditions = getattr(instance, spec['renditions_field']) or {}
+    if not image or renditions.get('source') == image.name:
+        return
+    task, created = RenditionTask.objects.get_or_create(
+        model=sender._meta.label, object_id=instance.pk, source=image.name)
+    if not created and task.status == RenditionTask.DONE:
+        # Объект сохранили с устаревшим списком вариантов,
+        # их нужно записать заново.
+        RenditionTask.objects.filter(pk=task.pk).update(
+            status=RenditionTask.PENDING, attempts=0)
+
+
+for label in IMAGE_RENDITIONS:
+    post_save.connect(image_saved, sender=label,
+                      dispatch_uid=f'renditions_image_saved_{label}')
@@ -0,0 +1,146 @@
+import difflib
+import re
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.db import connection
+from rest_framework.test import APIClient, APITestCase
+
+from common.middleware import RequestTiming, normalize_sql
+from recipes.models import (FavoriteRecipe,
+                            Ingredient,
+                            Recipe,
+                            RecipeIngredient,
+                            RecipeTag,
+                            ShoppingCart,
+                            Tag)
+from users.models import AppUser, Subscribtion
+
+SMALL = 2
+LARGE = 10
+
+# Многострочный INSERT в SQLite, ветки CASE из bulk_update и имена
+# точек сохранения транзакций зависят от числа объектов.
+UNION_ROWS = re.compile(r'(?: UNION ALL SELECT %s(?:, %s)*)+')
+CASE_BRANCHES = re.compile(r'(?: WHEN \([^()]*\) THEN %s)+')
+SAVEPOINT_NAME = re.compile(r'"s\d+_x\d+"')
+
+PNG = ('data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAf'
+       'FcSJAAAADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg==')
+
+
+def normalize(sql):
+    sql = UNION_ROWS.sub(' UNION ALL ...', sql)
+    sql = CASE_BRANCHES.sub(' WHEN ... THEN ...', sql)
+    return normalize_sql(SAVEPOINT_NAME.sub('"savepoint"', sql))
+
+
+class QueryBudgetTestCase(APITestCase):
+    """
+    Базовый класс для проверки, что число запросов к базе не зависит
+    от размера страницы или количества связанных объектов.
+
+    Данные: LARGE + 2 авторов, у каждого по LARGE рецептов с тремя
+    ингредиентами и двумя тэгами. Пользователь user подписан на всех
+    авторов, а часть рецептов есть у него в избранном и списке покупок.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tags = [Tag.objects.create(name=f'Тэг {i}', slug=f'tag{i}')
+                    for i in range(LARGE)]
+        cls.ingredients = [
+            Ingredient.objects.create(name=f'ингредиент {i}',
+                                      measurement_unit='г')
+            for i in range(LARGE * 2)]
+        cls.user = cls.create_user('user')
+        cls.authors = [cls.create_user(f'author{i}')
+                       for i in range(LARGE + 2)]
+        cls.recipes = []
+        for author in cls.authors:
+            for number in range(LARGE):
+                cls.recipes.append(cls.create_recipe(
+                    author, ingredients=3, tags=2, offset=number))
+        for author in cls.authors:
+            Subscribtion.objects.create(user=cls.user, is_subscribed_to=author)
+        for recipe in cls.recipes[:LARGE + 2]:
+            FavoriteRecipe.objects.create(user=cls.user, recipe=recipe)
+            ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+
+    @classmethod
+    def create_user(cls, username):
+        return AppUser.objects.create_user(
+            email=f'{username}@example.com', username=username,
+            password='password', first_name='Имя', last_name='Фамилия')
+
+    @classmethod
+    def create_recipe(cls, author, ingredients, tags, offset=0):
+        recipe = Recipe.objects.create(
+            author=author, name=f'Рецепт {author.username} {offset}',
+            image='recipes/images/test.png', text='Описание',
+            cooking_time=10)
+        for i in range(ingredients):
+            RecipeIngredient.objects.create(
+                recipe=recipe,
+                ingredient=cls.ingredients[(offset + i)
+                                           % len(cls.ingredients)],
+                amount=i + 1)
+        for i in range(tags):
+            RecipeTag.objects.create(
+                recipe=recipe, tag=cls.tags[(offset + i) % len(cls.tags)])
+        return recipe
+
+    def setUp(self):
+        self.client = self.client_for(self.user)
+
+    def client_for(self, user):
+        client = APIClient()
+        if user is not None:
+            client.force_authenticate(user)
+        return client
+
+    def recipe_payload(self, ingredients, tags=1):
+        return {
+            'ingredients': [{'id': ingredient.id, 'amount': amount + 1}
+                            for amount, ingredient
+                            in enumerate(self.ingredients[:ingredients])],
+            'tags': [tag.id for tag in self.tags[:tags]],
+            'image': PNG,
+            'name': 'Новый рецепт',
+            'text': 'Описание',
+            'cooking_time': 5,
+        }
+
+    @contextmanager
+    def capture_queries(self):
+        """
+        Собирает SQL-запросы с плейсхолдерами вместо значений. Кэши
+        ответов сбрасываются заранее, чтобы измерялся запрос без кэша:
+        в TestCase транзакции не фиксируются и версии кэшей не меняются.
+        """
+        cache.clear()
+        timing = RequestTiming()
+        with connection.execute_wrapper(timing):
+            yield timing.queries
+
+    def assertConstantQueries(self, request, expected_status,
+                              small=SMALL, large=LARGE):
+        """
+        Выполняет request(small) и request(large) и проверяет, что число
+        запросов к базе одинаковое. При ошибке выводит разницу между
+        нормализованными запросами.
+        """
+        counts = {}
+        for size in (small, large):
+            with self.capture_queries() as queries:
+                response = request(size)
+            self.assertEqual(response.status_code, expected_status,
+                             f'N={size}: {getattr(response, "data", "")}')
+            counts[size] = [normalize(sql) for sql, _ in queries]
+        if len(counts[small]) != len(counts[large]):
+            diff = '\n'.join(difflib.unified_diff(
+                counts[small], counts[large],
+                f'N={small}', f'N={large}', lineterm=''))
+            self.fail(f'{len(counts[small])} queries for N={small}, '
+                      f'{len(counts[large])} for N={large}:\n{diff}')
+        return len(counts[large])
@@ -0,0 +1,122 @@
+from asgiref.sync import async_to_sync
+from asgiref.testing import ApplicationCommunicator
+from django.test import TransactionTestCase
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from common.views import AsyncReadHandler
+from recipes.models import (FavoriteRecipe,
+                            Ingredient,
+                            Recipe,
+                            RecipeIngredient,
+                            RecipeTag,
+                            ShoppingCart,
+                            Tag)
+from users.models import AppUser
+
+
+class AsyncReadViewsTest(TransactionTestCase):
+    """
+    Запросы через ASGI-обработчик: чтение выполняется в пуле потоков,
+    запись - как у синхронных представлений. Ответы должны совпадать
+    с ответами тех же представлений под WSGI.
+    """
+
+    def setUp(self):
+        self.user = AppUser.objects.create_user(
+            email='user@example.com', username='user', password='password',
+            first_name='Имя', last_name='Фамилия')
+        self.token = Token.objects.create(user=self.user)
+        tag = Tag.objects.create(name='Завтрак', slug='breakfast')
+        ingredient = Ingredient.objects.create(name='ингредиент',
+                                               measurement_unit='г')
+        self.recipes = []
+        for number in range(2):
+            recipe = Recipe.objects.create(
+                author=self.user, name=f'Рецепт {number}',
+                image='recipes/images/test.png', text='Описание',
+                cooking_time=10)
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=number + 1)
+            RecipeTag.objects.create(recipe=recipe, tag=tag)
+            ShoppingCart.objects.create(user=self.user, recipe=recipe)
+            self.recipes.append(recipe)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+
+    @async_to_sync
+    async def asgi_request(self, method, path, query_string=''):
+        communicator = ApplicationCommunicator(AsyncReadHandler(), {
+            'type': 'http',
+            'asgi': {'version': '3.0'},
+            'http_version': '1.1',
+            'method': method,
+            'scheme': 'http',
+            'path': path,
+            'query_string': query_string.encode(),
+            'headers': [(b'host', b'testserver'),
+                        (b'authorization',
+                         f'Token {self.token}'.encode())],
+            'server': ('testserver', 80),
+        })
+        await communicator.send_input({'type': 'http.request'})
+        start = await communicator.receive_output(timeout=5)
+        parts = []
+        while True:
+            message = await communicator.receive_output(timeout=5)
+            if message.get('body'):
+                parts.append(message['body'])
+            if not message.get('more_body'):
+                break
+        return start['status'], dict(start['headers']), parts
+
+    def test_read_views(self):
+        recipe = self.recipes[0]
+        requests = (
+            ('/api/recipes/', 'limit=1'),
+            ('/api/recipes/', 'is_in_shopping_cart=1'),
+            (f'/api/recipes/{recipe.id}/', ''),
+            ('/api/tags/', ''),
+            ('/api/ingredients/', 'name=инг'),
+            ('/api/recipes/download_shopping_cart/', 'format=csv'),
+            ('/api/recipes/download_shopping_cart/', 'format=pdf'),
+        )
+        for path, query_string in requests:
+            with self.subTest(path=path, query_string=query_string):
+                expected = self.client.get(f'{path}?{query_string}')
+                status_code, _, parts = self.asgi_request(
+                    'GET', path, query_string)
+                self.assertEqual(status_code, status.HTTP_200_OK)
+                self.assertEqual(b''.join(parts), b''.join(expected))
+
+    def test_streaming_response(self):
+        """Список покупок уходит частями, а не одним сообщением."""
+        expected = list(self.client.get(
+            '/api/recipes/download_shopping_cart/'))
+        status_code, _, parts = self.asgi_request(
+            'GET', '/api/recipes/download_shopping_cart/')
+        self.assertEqual(status_code, status.HTTP_200_OK)
+        self.assertGreater(len(expected), 1)
+        self.assertEqual(parts, expected)
+
+    def test_short_link_redirect(self):
+        recipe = self.recipes[0]
+        status_code, headers, _ = self.asgi_request(
+            'GET', f'/s/{recipe.short_code}/')
+        self.assertEqual(status_code, status.HTTP_302_FOUND)
+        self.assertEqual(headers[b'Location'],
+                         f'/recipes/{recipe.id}/'.encode())
+
+    def test_write_views(self):
+        recipe = self.recipes[1]
+        status_code, _, _ = self.asgi_request(
+            'POST', f'/api/recipes/{recipe.id}/favorite/')
+        self.assertEqual(status_code, status.HTTP_201_CREATED)
+        self.assertTrue(FavoriteRecipe.objects.filter(
+            user=self.user, recipe=recipe).exists())
+        status_code, _, _ = self.asgi_request(
+            'DELETE', f'/api/recipes/{recipe.id}/favorite/')
+        self.assertEqual(status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(FavoriteRecipe.objects.filter(
+            user=self.user, recipe=recipe).exists())
@@ -0,0 +1,169 @@
+from unittest import mock
+
+from django.db import DatabaseError
+from rest_framework import status
+
+from recipes.counters import find_counter_drift
+from recipes.models import FavoriteRecipe, Recipe, ShoppingCart
+from recipes.shopping_lists import (get_live_shopping_list_totals,
+                                    get_stored_shopping_list_totals)
+from tests.base import LARGE, QueryBudgetTestCase
+
+
+class DenormalizedDataTest(QueryBudgetTestCase):
+    """
+    После каждой операции записи списки покупок и счетчики совпадают
+    с тем, что получается при подсчете по исходным таблицам.
+    """
+
+    def assertConsistent(self):
+        self.assertEqual(dict(get_stored_shopping_list_totals()),
+                         dict(get_live_shopping_list_totals()))
+        self.assertEqual(
+            [(model.__name__, field, count)
+             for model, field, count in find_counter_drift() if count],
+            [])
+
+    def test_initial_data(self):
+        self.assertConsistent()
+
+    def test_favorite_and_shopping_cart(self):
+        recipe = self.recipes[-1]
+        client = self.client_for(self.authors[0])
+        for action in ('favorite', 'shopping_cart'):
+            with self.subTest(action):
+                response = client.post(f'/api/recipes/{recipe.id}/{action}/')
+                self.assertEqual(response.status_code,
+                                 status.HTTP_201_CREATED)
+                self.assertConsistent()
+                response = client.post(f'/api/recipes/{recipe.id}/{action}/')
+                self.assertEqual(response.status_code,
+                                 status.HTTP_400_BAD_REQUEST)
+                self.assertConsistent()
+                response = client.delete(
+                    f'/api/recipes/{recipe.id}/{action}/')
+                self.assertEqual(response.status_code,
+                                 status.HTTP_204_NO_CONTENT)
+                self.assertConsistent()
+
+    def test_shopping_cart_add_is_atomic(self):
+        """Ошибка при обновлении списка покупок отменяет всю запись."""
+        recipe = self.recipes[-1]
+        user = self.authors[0]
+        with mock.patch('recipes.signals.add_recipes_to_shopping_list',
+                        side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                self.client_for(user).post(
+                    f'/api/recipes/{recipe.id}/shopping_cart/')
+        self.assertFalse(ShoppingCart.objects.filter(
+            user=user, recipe=recipe).exists())
+        self.assertConsistent()
+
+    def test_user_locked_before_write(self):
+        """
+        Пользователь блокируется до записи в избранное и корзину,
+        в том же порядке, что и в массовых запросах.
+        """
+        recipe = self.recipes[-1]
+        user = self.authors[0]
+        client = self.client_for(user)
+        for model, action in ((FavoriteRecipe, 'favorite'),
+                              (ShoppingCart, 'shopping_cart')):
+            for method, url, exists in (
+                    ('post', f'/api/recipes/{recipe.id}/{action}/', False),
+                    ('delete', f'/api/recipes/{recipe.id}/{action}/', True),
+                    ('post', f'/api/recipes/{action}/', False),
+                    ('delete', f'/api/recipes/{action}/', True)):
+                with self.subTest(url=url, method=method):
+                    lock = mock.Mock(side_effect=lambda user_ids: (
+                        self.assertEqual(model.objects.filter(
+                            user=user, recipe=recipe).exists(), exists)))
+                    with mock.patch('recipes.views.lock_user_lists', lock):
+                        getattr(client, method)(
+                            url, {'recipes': [recipe.id]}, format='json')
+                    lock.assert_called_once_with([user.pk])
+                    self.assertConsistent()
+
+    def test_batch(self):
+        new, existing = self.recipes[-1], self.recipes[0]
+        missing_id = Recipe.objects.order_by('-pk').first().pk + 1
+        for action in ('favorite', 'shopping_cart'):
+            with self.subTest(action):
+                response = self.client.post(
+                    f'/api/recipes/{action}/',
+                    {'recipes': [new.id, existing.id, missing_id]},
+                    format='json')
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(
+                    [item['status'] for item in response.data['results']],
+                    ['added', 'exists', 'not_found'])
+                self.assertConsistent()
+                response = self.client.delete(
+                    f'/api/recipes/{action}/',
+                    {'recipes': [new.id, self.recipes[-2].id, missing_id]},
+                    format='json')
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(
+                    [item['status'] for item in response.data['results']],
+                    ['removed', 'missing', 'not_found'])
+                self.assertConsistent()
+
+    def test_update_recipe(self):
+        """Ингредиенты рецепта, который лежит в нескольких корзинах."""
+        author = self.authors[0]
+        recipe = self.create_recipe(author, ingredients=4, tags=1)
+        for user in self.authors[1:4]:
+            ShoppingCart.objects.create(user=user, recipe=recipe)
+        ingredients = list(recipe.recipe_ingredients.all())
+        payload = self.recipe_payload(ingredients=0, tags=1)
+        del payload['image']
+        payload['ingredients'] = [
+            {'id': ingredients[0].ingredient_id,
+             'amount': ingredients[0].amount},
+            {'id': ingredients[1].ingredient_id,
+             'amount': ingredients[1].amount + 5},
+            {'id': self.ingredients[LARGE].id, 'amount': 7},
+        ]
+        response = self.client_for(author).patch(
+            f'/api/recipes/{recipe.id}/', payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertConsistent()
+
+    def test_delete_recipe(self):
+        author = self.authors[0]
+        recipe = self.create_recipe(author, ingredients=3, tags=1)
+        for user in self.authors[1:4]:
+            FavoriteRecipe.objects.create(user=user, recipe=recipe)
+            ShoppingCart.objects.create(user=user, recipe=recipe)
+        response = self.client_for(author).delete(
+            f'/api/recipes/{recipe.id}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Recipe.objects.filter(pk=recipe.pk).exists())
+        self.assertConsistent()
+
+    def test_subscribe(self):
+        client = self.client_for(self.authors[0])
+        author = self.authors[1]
+        response = client.post(f'/api/users/{author.id}/subscribe/')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertConsistent()
+        response = client.delete(f'/api/users/{author.id}/subscribe/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertConsistent()
+
+
+class ReferenceETagTest(QueryBudgetTestCase):
+
+    def test_not_modified(self):
+        for url in ('/api/tags/', f'/api/tags/{self.tags[0].id}/',
+                    '/api/ingredients/?name=ингр'):
+            with self.subTest(url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                etag = response['ETag']
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+                self.assertEqual(response.status_code,
+                                 status.HTTP_304_NOT_MODIFIED)
+                self.assertEqual(response['ETag'], etag)
+                response = self.client.get(url, HTTP_IF_NONE_MATCH='"old"')
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
@@ -0,0 +1,70 @@
+from django.core.cache import cache
+from django.utils import timezone
+from rest_framework import status
+
+from recipes.models import Recipe
+from tests.base import QueryBudgetTestCase
+
+
+class CursorPaginationTest(QueryBudgetTestCase):
+    """
+    Курсор ставится по (-pub_date, -id): рецепты с одинаковой датой
+    публикации не пропускаются и не повторяются, в том числе когда
+    между запросами страниц появляются новые рецепты.
+    """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.pub_date = timezone.now()
+        Recipe.objects.update(pub_date=self.pub_date)
+
+    def get_pages(self, url, link, on_page=None):
+        pages = []
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            pages.append([item['id'] for item in response.data['results']])
+            if on_page is not None:
+                on_page()
+            url = response.data[link]
+        return pages, response
+
+    def add_recipe(self):
+        recipe = self.create_recipe(self.authors[0], ingredients=1, tags=1)
+        Recipe.objects.filter(pk=recipe.pk).update(pub_date=self.pub_date)
+
+    def test_recipes_with_same_pub_date(self):
+        expected = sorted((recipe.id for recipe in self.recipes),
+                          reverse=True)
+        pages, last_page = self.get_pages(
+            '/api/recipes/?pagination=cursor&limit=4', 'next',
+            on_page=self.add_recipe)
+        self.assertEqual(sum(pages, []), expected)
+        self.assertTrue(all(pages))
+
+        # Назад видны и рецепты, добавленные во время обхода.
+        expected = list(Recipe.objects.order_by('-pub_date', '-id')
+                        .values_list('id', flat=True))
+        pages, _ = self.get_pages(last_page.data['previous'], 'previous')
+        self.assertEqual(sum(reversed(pages), []),
+                         expected[:-len(last_page.data['results'])])
+
+    def test_subscriptions(self):
+        pages, _ = self.get_pages(
+            '/api/users/subscriptions/?pagination=cursor&limit=2', 'next')
+        self.assertEqual(
+            sum(pages, []),
+            [author.id for author in sorted(
+                self.authors, key=lambda author: author.username)])
+
+    def test_search_is_rejected(self):
+        response = self.client.get(
+            '/api/recipes/', {'pagination': 'cursor', 'search': 'рецепт'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('search', response.data)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(
+            '/api/recipes/', {'pagination': 'cursor', 'cursor': 'cD0x'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
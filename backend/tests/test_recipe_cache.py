@@ -0,0 +1,22 @@
+from django.core.cache import cache
+from rest_framework import status
+
+from tests.base import QueryBudgetTestCase
+
+
+class RecipePageCacheTest(QueryBudgetTestCase):
+    """Общая страница списка рецептов в кэше не зависит от пользователя."""
+
+    def test_user_filters_not_in_shared_links(self):
+        cache.clear()
+        response = self.client_for(None).get(
+            '/api/recipes/', {'limit': 2, 'is_favorited': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('is_favorited=1', response.data['next'])
+
+        response = self.client.get('/api/recipes/', {'limit': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('is_favorited', response.data['next'])
+        response = self.client.get(response.data['next'])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 2)
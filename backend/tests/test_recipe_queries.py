@@ -0,0 +1,190 @@
+from rest_framework import status
+
+from recipes.models import FavoriteRecipe, ShoppingCart
+from tests.base import LARGE, SMALL, QueryBudgetTestCase
+
+
+class RecipeReadQueriesTest(QueryBudgetTestCase):
+
+    def test_recipe_list(self):
+        for name, client in (('anonymous', self.client_for(None)),
+                             ('user', self.client)):
+            with self.subTest(name):
+                self.assertConstantQueries(
+                    lambda n: client.get('/api/recipes/', {'limit': n}),
+                    status.HTTP_200_OK)
+
+    def test_recipe_list_cursor_pagination(self):
+        self.assertConstantQueries(
+            lambda n: self.client.get(
+                '/api/recipes/', {'limit': n, 'pagination': 'cursor'}),
+            status.HTTP_200_OK)
+
+    def test_recipe_list_filters(self):
+        filters = {
+            'is_favorited': {'is_favorited': 1},
+            'is_in_shopping_cart': {'is_in_shopping_cart': 1},
+            'author': {'author': self.authors[0].id},
+            'search': {'search': 'рецепт'},
+        }
+        for name, params in filters.items():
+            with self.subTest(name):
+                self.assertConstantQueries(
+                    lambda n: self.client.get(
+                        '/api/recipes/', {**params, 'limit': n}),
+                    status.HTTP_200_OK)
+
+    def test_recipe_list_tags(self):
+        self.assertConstantQueries(
+            lambda n: self.client.get('/api/recipes/', {
+                'tags': [tag.slug for tag in self.tags[:n]], 'limit': n}),
+            status.HTTP_200_OK)
+        # У каждого автора есть рецепт с обоими первыми тэгами.
+        self.assertConstantQueries(
+            lambda n: self.client.get('/api/recipes/', {
+                'tags': [tag.slug for tag in self.tags[:2]],
+                'tags_match': 'all', 'limit': n}),
+            status.HTTP_200_OK)
+
+    def test_recipe_detail(self):
+        recipes = {n: self.create_recipe(self.authors[0], ingredients=n,
+                                         tags=n)
+                   for n in (SMALL, LARGE)}
+        self.assertConstantQueries(
+            lambda n: self.client.get(f'/api/recipes/{recipes[n].id}/'),
+            status.HTTP_200_OK)
+
+    def test_recipe_get_link(self):
+        self.assertConstantQueries(
+            lambda n: self.client.get(
+                f'/api/recipes/{self.recipes[n].id}/get-link/'),
+            status.HTTP_200_OK)
+
+    def test_short_link_redirect(self):
+        self.assertConstantQueries(
+            lambda n: self.client.get(f'/s/{self.recipes[n].short_code}/'),
+            status.HTTP_302_FOUND)
+
+    def test_download_shopping_cart(self):
+        users = {SMALL: self.authors[0], LARGE: self.authors[1]}
+        for n, user in users.items():
+            for recipe in self.recipes[-n:]:
+                ShoppingCart.objects.create(user=user, recipe=recipe)
+        for data_format in ('txt', 'csv', 'json', 'pdf'):
+            with self.subTest(data_format):
+                self.assertConstantQueries(
+                    lambda n: self.client_for(users[n]).get(
+                        '/api/recipes/download_shopping_cart/',
+                        {'format': data_format}),
+                    status.HTTP_200_OK)
+
+    def test_tags(self):
+        self.assertConstantQueries(
+            lambda n: self.client.get('/api/tags/'), status.HTTP_200_OK)
+        self.assertConstantQueries(
+            lambda n: self.client.get(f'/api/tags/{self.tags[n - 1].id}/'),
+            status.HTTP_200_OK)
+
+    def test_ingredients(self):
+        self.assertConstantQueries(
+            lambda n: self.client.get(
+                '/api/ingredients/', {'name': 'ингр', 'limit': n}),
+            status.HTTP_200_OK)
+        self.assertConstantQueries(
+            lambda n: self.client.get(
+                f'/api/ingredients/{self.ingredients[n].id}/'),
+            status.HTTP_200_OK)
+
+
+class RecipeWriteQueriesTest(QueryBudgetTestCase):
+
+    def test_create_recipe(self):
+        self.assertConstantQueries(
+            lambda n: self.client.post(
+                '/api/recipes/', self.recipe_payload(ingredients=n, tags=n),
+                format='json'),
+            status.HTTP_201_CREATED)
+
+    def test_update_recipe(self):
+        """
+        Замена всех ингредиентов рецепта, который лежит в списке покупок:
+        n строк удаляется, n добавляется и списки покупок пересчитываются.
+        """
+        author, buyer = self.authors[0], self.authors[-1]
+        recipes = {}
+        for n in (SMALL, LARGE):
+            recipes[n] = self.create_recipe(author, ingredients=n, tags=n)
+            ShoppingCart.objects.create(user=buyer, recipe=recipes[n])
+
+        def update(n):
+            payload = self.recipe_payload(ingredients=0, tags=n)
+            del payload['image']
+            payload['ingredients'] = [
+                {'id': ingredient.id, 'amount': 1}
+                for ingredient in self.ingredients[LARGE:LARGE + n]]
+            return self.client_for(author).patch(
+                f'/api/recipes/{recipes[n].id}/', payload, format='json')
+
+        self.assertConstantQueries(update, status.HTTP_200_OK)
+
+    def test_update_recipe_amounts(self):
+        author = self.authors[0]
+        recipes = {n: self.create_recipe(author, ingredients=n, tags=1)
+                   for n in (SMALL, LARGE)}
+
+        def update(n):
+            payload = self.recipe_payload(ingredients=0, tags=1)
+            del payload['image']
+            payload['ingredients'] = [
+                {'id': recipe_ingredient.ingredient_id,
+                 'amount': recipe_ingredient.amount + 1}
+                for recipe_ingredient
+                in recipes[n].recipe_ingredients.all()]
+            return self.client_for(author).patch(
+                f'/api/recipes/{recipes[n].id}/', payload, format='json')
+
+        self.assertConstantQueries(update, status.HTTP_200_OK)
+
+    def test_delete_recipe(self):
+        """Удаление рецепта, который есть в избранном и списках покупок."""
+        author = self.authors[0]
+        recipes = {}
+        for n in (SMALL, LARGE):
+            recipes[n] = self.create_recipe(author, ingredients=n, tags=n)
+            for user in self.authors[1:n + 1]:
+                FavoriteRecipe.objects.create(user=user, recipe=recipes[n])
+                ShoppingCart.objects.create(user=user, recipe=recipes[n])
+        self.assertConstantQueries(
+            lambda n: self.client_for(author).delete(
+                f'/api/recipes/{recipes[n].id}/'),
+            status.HTTP_204_NO_CONTENT)
+
+    def test_favorite_and_shopping_cart(self):
+        recipes = {n: self.create_recipe(self.authors[0], ingredients=n,
+                                         tags=1)
+                   for n in (SMALL, LARGE)}
+        for action in ('favorite', 'shopping_cart'):
+            with self.subTest(action):
+                self.assertConstantQueries(
+                    lambda n: self.client.post(
+                        f'/api/recipes/{recipes[n].id}/{action}/'),
+                    status.HTTP_201_CREATED)
+                self.assertConstantQueries(
+                    lambda n: self.client.delete(
+                        f'/api/recipes/{recipes[n].id}/{action}/'),
+                    status.HTTP_204_NO_CONTENT)
+
+    def test_batch_favorite_and_shopping_cart(self):
+        # Рецепты, которых еще нет в списках пользователя.
+        batches = {SMALL: self.recipes[-SMALL:],
+                   LARGE: self.recipes[-SMALL - LARGE:-SMALL]}
+        for action in ('favorite', 'shopping_cart'):
+            with self.subTest(action):
+                for method in ('post', 'delete'):
+                    self.assertConstantQueries(
+                        lambda n: getattr(self.client, method)(
+                            f'/api/recipes/{action}/',
+                            {'recipes': [recipe.id
+                                         for recipe in batches[n]]},
+                            format='json'),
+                        status.HTTP_200_OK)
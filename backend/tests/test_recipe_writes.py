@@ -0,0 +1,96 @@
+import re
+
+from rest_framework import status
+
+from recipes.models import RecipeIngredient, RecipeTag
+from tests.base import LARGE, QueryBudgetTestCase
+
+WRITE = re.compile(r'^(INSERT INTO|UPDATE|DELETE FROM) "(\w+)"')
+
+
+class RecipeBulkWritesTest(QueryBudgetTestCase):
+    """
+    Ингредиенты и тэги рецепта пишутся массовыми запросами, а при
+    изменении рецепта меняются только отличающиеся строки.
+    """
+
+    def get_writes(self, queries, table):
+        writes = []
+        for sql, _ in queries:
+            match = WRITE.match(sql)
+            if match and match[2] == table:
+                writes.append(match[1])
+        return writes
+
+    def get_ingredients(self, recipe_id):
+        return dict(RecipeIngredient.objects.filter(recipe=recipe_id)
+                    .values_list('ingredient_id', 'amount'))
+
+    def get_tags(self, recipe_id):
+        return set(RecipeTag.objects.filter(recipe=recipe_id)
+                   .values_list('tag_id', flat=True))
+
+    def update(self, recipe, ingredients, tags):
+        payload = self.recipe_payload(ingredients=0, tags=0)
+        del payload['image']
+        payload['ingredients'] = [
+            {'id': ingredient_id, 'amount': amount}
+            for ingredient_id, amount in ingredients.items()]
+        payload['tags'] = [tag.id for tag in tags]
+        with self.capture_queries() as queries:
+            response = self.client_for(recipe.author).patch(
+                f'/api/recipes/{recipe.id}/', payload, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK,
+                         response.data)
+        return queries
+
+    def test_create(self):
+        payload = self.recipe_payload(ingredients=LARGE, tags=LARGE)
+        with self.capture_queries() as queries:
+            response = self.client.post('/api/recipes/', payload,
+                                        format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED,
+                         response.data)
+        self.assertEqual(
+            self.get_writes(queries, RecipeIngredient._meta.db_table),
+            ['INSERT INTO'])
+        self.assertEqual(self.get_writes(queries, RecipeTag._meta.db_table),
+                         ['INSERT INTO'])
+        recipe_id = response.data['id']
+        self.assertEqual(
+            self.get_ingredients(recipe_id),
+            {item['id']: item['amount'] for item in payload['ingredients']})
+        self.assertEqual(self.get_tags(recipe_id), set(payload['tags']))
+
+    def test_update_changed_rows(self):
+        recipe = self.create_recipe(self.authors[0], ingredients=4, tags=2)
+        current = self.get_ingredients(recipe.id)
+        kept, changed = list(current)[:2]
+        new_ingredients = {
+            kept: current[kept],
+            changed: current[changed] + 10,
+            self.ingredients[LARGE].id: 5,
+            self.ingredients[LARGE + 1].id: 6,
+        }
+        new_tags = self.tags[1:4]
+        queries = self.update(recipe, new_ingredients, new_tags)
+        self.assertEqual(
+            self.get_writes(queries, RecipeIngredient._meta.db_table),
+            ['DELETE FROM', 'UPDATE', 'INSERT INTO'])
+        self.assertEqual(self.get_writes(queries, RecipeTag._meta.db_table),
+                         ['DELETE FROM', 'INSERT INTO'])
+        self.assertEqual(self.get_ingredients(recipe.id), new_ingredients)
+        self.assertEqual(self.get_tags(recipe.id),
+                         {tag.id for tag in new_tags})
+
+    def test_update_without_changes(self):
+        recipe = self.create_recipe(self.authors[0], ingredients=LARGE,
+                                    tags=2)
+        ingredients = self.get_ingredients(recipe.id)
+        tags = [tag for tag in self.tags if tag.id in self.get_tags(
+            recipe.id)]
+        queries = self.update(recipe, ingredients, tags)
+        self.assertEqual(
+            self.get_writes(queries, RecipeIngredient._meta.db_table), [])
+        self.assertEqual(self.get_writes(queries, RecipeTag._meta.db_table),
+                         [])
@@ -0,0 +1,76 @@
+import os
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.test import TestCase, override_settings
+from PIL import Image
+
+from recipes.models import Recipe
+from renditions.models import RenditionTask
+from renditions.processing import process_task
+from users.models import AppUser
+
+
+class RenditionFilesTest(TestCase):
+    """
+    Повторная обработка и общие изображения не создают копии файлов
+    вариантов, а варианты замененного изображения удаляются, когда
+    оно больше не стоит ни у одного объекта.
+    """
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root)
+        settings = override_settings(MEDIA_ROOT=self.media_root)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.author = AppUser.objects.create_user(
+            email='author@example.com', username='author',
+            password='password', first_name='Имя', last_name='Фамилия')
+
+    def save_image(self, name):
+        buffer = BytesIO()
+        Image.new('RGB', (64, 48), (200, 100, 50)).save(buffer, 'PNG')
+        return default_storage.save(name, ContentFile(buffer.getvalue()))
+
+    def create_recipe(self, image):
+        return Recipe.objects.create(
+            author=self.author, name='Рецепт', image=image,
+            text='Описание', cooking_time=10)
+
+    def process_pending(self):
+        for task in RenditionTask.objects.all():
+            process_task(task)
+
+    def list_renditions(self, source):
+        directory = os.path.join(self.media_root, 'renditions',
+                                 os.path.splitext(source)[0])
+        if not os.path.isdir(directory):
+            return []
+        return sorted(os.listdir(directory))
+
+    def test_shared_and_replaced_images(self):
+        shared = self.save_image('recipes/images/shared.png')
+        recipes = [self.create_recipe(shared) for _ in range(2)]
+        self.process_pending()
+        self.process_pending()
+        expected = ['thumbnail.jpg', 'thumbnail_webp.webp', 'webp.webp']
+        self.assertEqual(self.list_renditions(shared), expected)
+        renditions = [Recipe.objects.get(pk=recipe.pk).image_renditions
+                      for recipe in recipes]
+        self.assertEqual(renditions[0], renditions[1])
+        self.assertEqual(renditions[0]['source'], shared)
+
+        replacement = self.save_image('recipes/images/replacement.png')
+        for number, recipe in enumerate(recipes):
+            recipe = Recipe.objects.get(pk=recipe.pk)
+            recipe.image = replacement
+            recipe.save()
+            self.process_pending()
+            self.assertEqual(self.list_renditions(replacement), expected)
+            # Пока исходник стоит у второго рецепта, его варианты нужны.
+            self.assertEqual(self.list_renditions(shared),
+                             expected if number == 0 else [])
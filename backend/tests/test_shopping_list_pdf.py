@@ -0,0 +1,42 @@
+import re
+
+from rest_framework import status
+
+from recipes.models import Ingredient, ShoppingListIngredient
+from tests.base import QueryBudgetTestCase
+
+XREF_ENTRY = re.compile(rb'^(\d{10}) 00000 n $', re.MULTILINE)
+
+
+class ShoppingListPdfTest(QueryBudgetTestCase):
+    """
+    Список покупок в PDF: несколько страниц, таблица xref указывает
+    на объекты, кириллица выводится встроенным шрифтом.
+    """
+
+    def test_download(self):
+        for number in range(60):
+            ShoppingListIngredient.objects.create(
+                user=self.user, amount=number + 1,
+                ingredient=Ingredient.objects.create(
+                    name=f'длинное название ингредиента {number} ' * 3,
+                    measurement_unit='г'))
+        response = self.client.get('/api/recipes/download_shopping_cart/',
+                                   {'format': 'pdf'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        parts = list(response.streaming_content)
+        data = b''.join(parts)
+        self.assertTrue(data.startswith(b'%PDF-1.4\n'))
+        self.assertTrue(data.endswith(b'%%EOF\n'))
+
+        pages = data.count(b'/Type /Page ')
+        self.assertGreater(pages, 1)
+        self.assertEqual(len(parts), pages + 2)
+        xref = int(re.search(rb'startxref\n(\d+)\n', data)[1])
+        self.assertTrue(data[xref:].startswith(b'xref\n'))
+        offsets = [int(offset) for offset in XREF_ENTRY.findall(data)]
+        for number, offset in enumerate(offsets, start=1):
+            self.assertTrue(data[offset:].startswith(b'%d 0 obj\n' % number))
+        self.assertIn(b'/FontFile2', data)
+        self.assertIn(b'+DejaVuSans', data)
@@ -0,0 +1,98 @@
+from rest_framework import status
+
+from tests.base import LARGE, PNG, SMALL, QueryBudgetTestCase
+
+
+class UserReadQueriesTest(QueryBudgetTestCase):
+
+    def test_user_list(self):
+        for name, client in (('anonymous', self.client_for(None)),
+                             ('user', self.client)):
+            with self.subTest(name):
+                self.assertConstantQueries(
+                    lambda n: client.get('/api/users/', {'limit': n}),
+                    status.HTTP_200_OK)
+
+    def test_user_detail(self):
+        self.assertConstantQueries(
+            lambda n: self.client.get(f'/api/users/{self.authors[n].id}/'),
+            status.HTTP_200_OK)
+
+    def test_user_me(self):
+        self.assertConstantQueries(
+            lambda n: self.client_for(self.authors[n]).get('/api/users/me/'),
+            status.HTTP_200_OK)
+
+    def test_subscriptions(self):
+        cases = {
+            'limit': lambda n: {'limit': n},
+            'recipes_limit': lambda n: {'limit': LARGE,
+                                        'recipes_limit': n},
+            'cursor': lambda n: {'limit': n, 'pagination': 'cursor'},
+        }
+        for name, params in cases.items():
+            with self.subTest(name):
+                self.assertConstantQueries(
+                    lambda n: self.client.get(
+                        '/api/users/subscriptions/', params(n)),
+                    status.HTTP_200_OK)
+
+
+class UserWriteQueriesTest(QueryBudgetTestCase):
+
+    def test_create_user(self):
+        self.assertConstantQueries(
+            lambda n: self.client_for(None).post('/api/users/', {
+                'email': f'new{n}@example.com',
+                'username': f'new{n}',
+                'first_name': 'Имя',
+                'last_name': 'Фамилия',
+                'password': 'Strong-password-1'}),
+            status.HTTP_201_CREATED)
+
+    def test_set_password(self):
+        self.assertConstantQueries(
+            lambda n: self.client_for(self.authors[n]).post(
+                '/api/users/set_password/',
+                {'current_password': 'password',
+                 'new_password': 'Strong-password-1'}),
+            status.HTTP_204_NO_CONTENT)
+
+    def test_token(self):
+        self.assertConstantQueries(
+            lambda n: self.client_for(None).post(
+                '/api/auth/token/login/',
+                {'email': self.authors[n].email, 'password': 'password'}),
+            status.HTTP_200_OK)
+        self.assertConstantQueries(
+            lambda n: self.client_for(self.authors[n]).post(
+                '/api/auth/token/logout/'),
+            status.HTTP_204_NO_CONTENT)
+
+    def test_avatar(self):
+        self.assertConstantQueries(
+            lambda n: self.client_for(self.authors[n]).put(
+                '/api/users/me/avatar/', {'avatar': PNG}, format='json'),
+            status.HTTP_200_OK)
+        self.assertConstantQueries(
+            lambda n: self.client_for(self.authors[n]).delete(
+                '/api/users/me/avatar/'),
+            status.HTTP_204_NO_CONTENT)
+
+    def test_subscribe(self):
+        """Подписка на автора с n рецептами и отписка от него."""
+        authors = {}
+        for n in (SMALL, LARGE):
+            authors[n] = self.create_user(f'new_author{n}')
+            for number in range(n):
+                self.create_recipe(authors[n], ingredients=1, tags=1,
+                                   offset=number)
+        subscriber = self.authors[0]
+        self.assertConstantQueries(
+            lambda n: self.client_for(subscriber).post(
+                f'/api/users/{authors[n].id}/subscribe/'),
+            status.HTTP_201_CREATED)
+        self.assertConstantQueries(
+            lambda n: self.client_for(subscriber).delete(
+                f'/api/users/{authors[n].id}/subscribe/'),
+            status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,20 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:42
+
+from django.db import migrations
+import users.querysets
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='appuser',
+            managers=[
+                ('objects', users.querysets.AppUserManager()),
+            ],
+        ),
+    ]
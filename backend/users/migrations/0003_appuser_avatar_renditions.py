@@ -0,0 +1,18 @@
+# Generated by Django 3.2.16 on 2026-10-18 17:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_appuser_manager'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appuser',
+            name='avatar_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False, verbose_name='Варианты аватарки'),
+        ),
+    ]
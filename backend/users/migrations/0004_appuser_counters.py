@@ -0,0 +1,23 @@
+# Generated by Django 3.2.16 on 2026-10-18 18:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_appuser_avatar_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appuser',
+            name='recipes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Количество рецептов'),
+        ),
+        migrations.AddField(
+            model_name='appuser',
+            name='subscribers_count',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='Количество подписчиков'),
+        ),
+    ]
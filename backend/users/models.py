@@ -4,6 +4,7 @@ from django.db import models
 from users.constants import (FIRST_NAME_MAX_LENGTH,
                              LAST_NAME_MAX_LENGTH,
                              USERNAME_MAX_LENGTH)
+from users.querysets import AppUserManager
 from users.validators import validate_username
 
 
@@ -23,10 +24,18 @@ class AppUser(AbstractUser):
     last_name = models.CharField('Фамилия', max_length=LAST_NAME_MAX_LENGTH)
     avatar = models.ImageField(
         'Аватарка', upload_to='users', blank=True, null=True)
+    avatar_renditions = models.JSONField(
+        'Варианты аватарки', default=dict, blank=True, editable=False)
+    recipes_count = models.PositiveIntegerField(
+        'Количество рецептов', default=0, editable=False)
+    subscribers_count = models.PositiveIntegerField(
+        'Количество подписчиков', default=0, editable=False, db_index=True)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ('username', 'first_name', 'last_name')
 
+    objects = AppUserManager()
+
     class Meta:
         verbose_name = 'пользователь'
         verbose_name_plural = 'Пользователи'
@@ -0,0 +1,40 @@
+from django.contrib.auth.models import UserManager
+from django.db.models import (QuerySet, Exists, OuterRef, Prefetch,
+                              Subquery, Value, BooleanField)
+
+
+class AppUserQuerySet(QuerySet):
+    def with_is_subscribed(self, user):
+        from users.models import Subscribtion
+        if user.is_authenticated:
+            return self.annotate(
+                is_subscribed=Exists(
+                    Subscribtion.objects.filter(
+                        user=user, is_subscribed_to=OuterRef('pk')
+                    )
+                )
+            )
+        return self.annotate(
+            is_subscribed=Value(False, output_field=BooleanField())
+        )
+
+    def with_recipes(self, recipes_limit=None):
+        """
+        Одним запросом подгружает для всех авторов страницы не более
+        recipes_limit последних рецептов в атрибут limited_recipes.
+        """
+        from recipes.models import Recipe
+        recipes = Recipe.objects.all()
+        if recipes_limit is not None:
+            recipes = recipes.filter(pk__in=Subquery(
+                Recipe.objects.filter(
+                    author=OuterRef('author')
+                ).values('pk')[:recipes_limit]
+            ))
+        return self.prefetch_related(
+            Prefetch('recipes', queryset=recipes, to_attr='limited_recipes')
+        )
+
+
+class AppUserManager(UserManager.from_queryset(AppUserQuerySet)):
+    pass
@@ -3,6 +3,7 @@ from rest_framework import serializers, validators
 
 from common.serializers import Base64ImageField, ShortResipeSerializer
 from common.validators import validate_recipes_limit
+from renditions.fields import ImageRenditionsField
 from users.models import Subscribtion
 
 
@@ -12,16 +13,23 @@ User = get_user_model()
 class AppUserSerializer(serializers.ModelSerializer):
     """Сериализатор для чтения информации о пользователе."""
     is_subscribed = serializers.SerializerMethodField()
+    avatar_renditions = ImageRenditionsField()
 
     class Meta:
         model = User
         fields = ('email', 'id', 'username', 'first_name',
-                  'last_name', 'is_subscribed', 'avatar')
+                  'last_name', 'is_subscribed', 'avatar', 'avatar_renditions')
 
     def get_is_subscribed(self, obj):
+        # Списки пользователей аннотируются флагом в основном запросе
+        # (AppUserQuerySet.with_is_subscribed), отдельный запрос к подпискам
+        # нужен только для объектов, полученных в обход этого метода.
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         request = self.context.get('request')
         return bool(request
                     and request.user.is_authenticated
+                    and request.user.pk != obj.pk
                     and Subscribtion.objects.filter(
                         user=request.user, is_subscribed_to=obj).exists())
 
@@ -29,14 +37,16 @@ class AppUserSerializer(serializers.ModelSerializer):
 class SubscribtionsUserSerialiser(AppUserSerializer):
     """Сериализатор для получения списка подписок пользователя."""
     recipes = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
 
     class Meta:
         model = User
         fields = ('email', 'id', 'username', 'first_name', 'last_name',
-                  'is_subscribed', 'recipes', 'recipes_count', 'avatar')
+                  'is_subscribed', 'recipes', 'recipes_count', 'avatar',
+                  'avatar_renditions')
 
     def get_recipes(self, obj):
+        if hasattr(obj, 'limited_recipes'):
+            return ShortResipeSerializer(obj.limited_recipes, many=True).data
         request = self.context.get('request')
         recipes_limit = request.query_params.get('recipes_limit')
         queryset = obj.recipes.all()
@@ -45,9 +55,6 @@ class SubscribtionsUserSerialiser(AppUserSerializer):
             queryset = obj.recipes.all()[:recipes_limit]
         return ShortResipeSerializer(queryset, many=True).data
 
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
-
 
 class SubscriptionCreateSerializer(serializers.ModelSerializer):
     """Сериализатор для подписки пользователя на другого."""
@@ -1,7 +1,7 @@
 from django.urls import include, path
-from djoser.views import UserViewSet
 
-from users.views import (ManageSubscribtionAPIView,
+from users.views import (AppUserViewSet,
+                         ManageSubscribtionAPIView,
                          SubscriptionListView,
                          UserAvatarAPIView,)
 
@@ -9,13 +9,14 @@ from users.views import (ManageSubscribtionAPIView,
 app_name = 'users'
 
 urlpatterns = [
-    path('users/', UserViewSet.as_view({'get': 'list', 'post': 'create'}),
+    path('users/', AppUserViewSet.as_view({'get': 'list', 'post': 'create'}),
          name='user-list-create'),
-    path('users/<int:id>/', UserViewSet.as_view({'get': 'retrieve'}),
+    path('users/<int:id>/', AppUserViewSet.as_view({'get': 'retrieve'}),
          name='user-detail'),
-    path('users/set_password/', UserViewSet.as_view({'post': 'set_password'}),
+    path('users/set_password/',
+         AppUserViewSet.as_view({'post': 'set_password'}),
          name='set-password'),
-    path('users/me/', UserViewSet.as_view({'get': 'me'}),
+    path('users/me/', AppUserViewSet.as_view({'get': 'me'}),
          name='user-me'),
     path('users/me/avatar/', UserAvatarAPIView.as_view(),
          name='user-me-avatar'),
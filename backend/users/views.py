@@ -1,10 +1,13 @@
 from django.contrib.auth import get_user_model
 from django.shortcuts import get_object_or_404
+from djoser.views import UserViewSet
 from rest_framework import generics, status
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
+from common.pagination import CursorPaginationMixin
+from common.validators import validate_recipes_limit
 from users.models import Subscribtion
 from users.serializers import (AvatarSerializer,
                                SubscriptionCreateSerializer,
@@ -14,6 +17,16 @@ from users.serializers import (AvatarSerializer,
 User = get_user_model()
 
 
+class AppUserViewSet(UserViewSet):
+    """
+    Класс для обработки запросов к пользователям djoser, в котором флаг
+    подписки вычисляется в основном запросе к базе.
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().with_is_subscribed(self.request.user)
+
+
 class UserAvatarAPIView(APIView):
     """Класс для обработки запросов на добавление и удаление аватарки."""
 
@@ -59,10 +72,18 @@ class ManageSubscribtionAPIView(APIView):
             status=status.HTTP_400_BAD_REQUEST)
 
 
-class SubscriptionListView(generics.ListAPIView):
+class SubscriptionListView(CursorPaginationMixin, generics.ListAPIView):
     """Класс для обработки запроса на получение списка подписок."""
     serializer_class = SubscribtionsUserSerialiser
     permission_classes = (IsAuthenticated,)
+    cursor_ordering = ('username',)
 
     def get_queryset(self):
-        return User.objects.filter(subscribers__user=self.request.user)
+        recipes_limit = self.request.query_params.get('recipes_limit')
+        if recipes_limit:
+            recipes_limit = validate_recipes_limit(recipes_limit)
+        else:
+            recipes_limit = None
+        return User.objects.filter(
+            subscribers__user=self.request.user
+        ).with_is_subscribed(self.request.user).with_recipes(recipes_limit)